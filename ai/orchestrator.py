@@ -6,11 +6,13 @@ Combines pattern-based routing with hybrid LangChain + AutoGen capability
 
 import re
 from typing import Dict, List, Any, Optional, Union
-from datetime import datetime
 import logging
 import asyncio
 import numpy as np
 import anthropic
+import httpx
+
+from utils.timestamps import iso_timestamp
 
 from .agents import (
     FinancialTutorAgent,
@@ -25,6 +27,14 @@ from .conversation_manager import AutoGenConversationManager
 
 logger = logging.getLogger(__name__)
 
+# Most recent chat turns forwarded to Claude as conversation context
+CHAT_HISTORY_MAX_TURNS = 20
+
+# Words that chain several requests into one query; compiled once into a
+# single alternation so each query is scanned in one pass
+CONNECTOR_KEYWORDS = (' and ', ' then ', ' after that ', ' once that is done ')
+_CONNECTOR_RE = re.compile("|".join(re.escape(keyword) for keyword in CONNECTOR_KEYWORDS))
+
 
 class QueryClassificationResult:
     """Result of query classification"""
@@ -54,9 +64,23 @@ class FinancialOrchestrator:
         
         self.query_history = []
         
+        # Created on first Claude call and reused for the orchestrator's lifetime,
+        # so keep-alive connections spare later calls the TCP + TLS handshake
+        self._claude_client: Optional[anthropic.AsyncAnthropic] = None
+        
         self._setup_routing_logic()
         self._setup_classification_patterns()
 
+    def _get_claude_client(self) -> anthropic.AsyncAnthropic:
+        """Shared Anthropic client backed by one pooled HTTP client"""
+        if self._claude_client is None:
+            self._claude_client = anthropic.AsyncAnthropic(
+                http_client=anthropic.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+                )
+            )
+        return self._claude_client
+
     def _initialize_agents(self):
         """Initialize all financial agents"""
         logger.info("Initializing financial agents...")
@@ -89,6 +113,10 @@ class FinancialOrchestrator:
             "monitoring": [r"monitor|watch|alert|track|surveillance|observe"],
             "strategic_planning": [r"fix my portfolio|develop a plan|comprehensive strategy|my overall approach"]
         }
+        self._compiled_patterns = {
+            category: [re.compile(pattern) for pattern in patterns]
+            for category, patterns in self.classification_patterns.items()
+        }
 
     def classify_query(self, query: str) -> QueryClassificationResult:
         """Classify the user query to determine appropriate agent routing"""
@@ -103,8 +131,8 @@ class FinancialOrchestrator:
         if "mean-reversion" in query_lower or "mean reversion" in query_lower:
             entities["strategy_goal"] = "mean-reversion"
 
-        for category, patterns in self.classification_patterns.items():
-            score = sum(len(re.findall(pattern, query_lower)) for pattern in patterns)
+        for category, patterns in self._compiled_patterns.items():
+            score = sum(len(pattern.findall(query_lower)) for pattern in patterns)
             if score > 0:
                 category_scores[category] = score
 
@@ -125,9 +153,7 @@ class FinancialOrchestrator:
         matched_categories = list(category_scores.keys())
         
         # Rule 2: Check for keywords that link actions.
-        connector_keywords = [' and ', ' then ', ' after that ', ' once that is done ']
-        
-        has_connector = any(keyword in query_lower for keyword in connector_keywords)
+        has_connector = _CONNECTOR_RE.search(query_lower) is not None
 
         if len(matched_categories) > 1 and has_connector:
             complexity = "multi-step"
@@ -150,21 +176,19 @@ class FinancialOrchestrator:
         2. Sequential Workflow for multi-step tasks
         3. Single Agent / Claude for simple tasks
         """
-        import os
-        print(f"🔑 DEBUG: ANTHROPIC_API_KEY exists: {'ANTHROPIC_API_KEY' in os.environ}")
-        
         context = context or {}
         portfolio_context = context.get("portfolio_context")
         
         # 1. Classify the query
         classification = self.classify_query(query)
-        print(f"[FinancialOrchestrator] Classification: {classification.query_type} (confidence: {classification.confidence:.2f}, complexity: {classification.complexity})")
+        logger.info("Classification: %s (confidence: %.2f, complexity: %s)",
+                    classification.query_type, classification.confidence, classification.complexity)
         
         # 2. --- NEW THREE-TIER ROUTER ---
 
         # Tier 1: Check for highly complex queries that require a collaborative group chat.
         if classification.query_type == 'strategic_planning':
-            print("🤝 ROUTING TO MULTI-AGENT GROUP CHAT...")
+            logger.info("Routing to multi-agent group chat")
             # Define the expert panel for this type of complex task
             participants = ['quantitative_analyst', 'strategy_architect', 'strategy_rebalancing']
             result = await self.conversation_manager.start_conversation(participants, query, context)
@@ -183,18 +207,19 @@ class FinancialOrchestrator:
             general_specialist_agents = ["educational", "strategy_design"]
 
             if classification.query_type in portfolio_specialist_agents:
-                print(f"🤖 ROUTING TO PORTFOLIO AGENT: {classification.required_agents[0]}")
+                logger.info("Routing to portfolio agent: %s", classification.required_agents[0])
                 if has_portfolio_context:
                     import json
                     context['portfolio_data'] = json.loads(portfolio_context)
                 return await self._handle_query(query, classification, context)
 
             elif classification.query_type in general_specialist_agents:
-                print(f"🤖 ROUTING TO GENERAL AGENT: {classification.required_agents[0]}")
+                logger.info("Routing to general agent: %s", classification.required_agents[0])
                 return await self._handle_query(query, classification, context)
                 
             else:
-                print(f"🧠 ROUTING TO CLAUDE (Default): Portfolio context={has_portfolio_context}, Query type={classification.query_type}")
+                logger.info("Routing to Claude (default): portfolio context=%s, query type=%s",
+                            has_portfolio_context, classification.query_type)
                 return await self._process_with_claude(query, context.get("chat_history", []), portfolio_context, classification)
 
     async def _process_with_claude(self, query: str, chat_history: List[Dict], portfolio_context: Optional[str], classification: QueryClassificationResult) -> Dict[str, Any]:
@@ -230,23 +255,25 @@ class FinancialOrchestrator:
 
         # Add Conversation History Block (if available)
         if chat_history:
-            history_str = "--- CONVERSATION HISTORY ---\n"
-            for turn in chat_history:
-                role = "Human" if turn.get("role") == "user" else "AI"
-                history_str += f"{role}: {turn.get('content')}\n"
-            history_str += "--- END HISTORY ---"
-            user_prompt_parts.append(history_str)
+            # Bounded window of recent turns, joined once (prompt cost no longer grows with the conversation)
+            history_lines = ["--- CONVERSATION HISTORY ---"]
+            history_lines.extend(
+                f"{'Human' if turn.get('role') == 'user' else 'AI'}: {turn.get('content')}"
+                for turn in chat_history[-CHAT_HISTORY_MAX_TURNS:]
+            )
+            history_lines.append("--- END HISTORY ---")
+            user_prompt_parts.append("\n".join(history_lines))
 
         # Add the Final User Query
         user_prompt_parts.append(f"Current Question: {query}")
         
         user_prompt = "\n\n".join(user_prompt_parts)
         
-        print(f"--- System Prompt ---\n{system_prompt}\n----------------------")
-        print(f"--- User Prompt ---\n{user_prompt}\n----------------------")
+        logger.debug("System prompt:\n%s", system_prompt)
+        logger.debug("User prompt:\n%s", user_prompt)
         
         try:
-            client = anthropic.AsyncAnthropic()
+            client = self._get_claude_client()
             message = await client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=1024,
@@ -255,7 +282,7 @@ class FinancialOrchestrator:
             )
             
             ai_message = message.content[0].text
-            print(f"Claude Response: {ai_message}")
+            logger.debug("Claude response: %s", ai_message)
             
             return {
                 "success": True, 
@@ -265,7 +292,7 @@ class FinancialOrchestrator:
             }
 
         except Exception as e:
-            print(f"🔥 Claude Call Failed: {e}")
+            logger.error("Claude call failed: %s", e)
             return {"success": False, "message": "I'm having trouble connecting to my AI brain. Please try again later."}
     
     def _build_llm_prompt(self, query: str, history: List[Dict], portfolio_json: Optional[str]) -> tuple[str, str]:
@@ -373,7 +400,7 @@ class FinancialOrchestrator:
         """
         Handles complex, multi-step queries by chaining agents together.
         """
-        print("🚀 KICKING OFF SEQUENTIAL WORKFLOW...")
+        logger.info("Starting sequential workflow")
         
         # In a more advanced version, we would dynamically determine the sequence.
         # For now, we hardcode it for our target query.
@@ -397,7 +424,7 @@ class FinancialOrchestrator:
                 return {"success": False, "message": f"Agent '{agent_name}' not found."}
 
             current_query = agent_queries.get(agent_name, query)
-            print(f"  -> Workflow Step {i+1}: Calling {agent_name} with query: '{current_query}'")
+            logger.info("Workflow step %d: calling %s with query: %r", i + 1, agent_name, current_query)
             
             result = await agent.process_request(current_query, current_context)
             step_response = result.get("response")
@@ -424,11 +451,11 @@ class FinancialOrchestrator:
                             continue # Ignore lines that don't parse correctly
                 
                 current_context['portfolio_data'] = mock_portfolio
-                print(f"  -> Context Updated: Passed mock portfolio {mock_portfolio} to next step.")
+                logger.debug("Context updated: passed mock portfolio %s to next step", mock_portfolio)
 
         # --- Response Synthesis ---
         final_message = "\n\n---\n\n".join(step_results)
-        print("✅ WORKFLOW COMPLETED. Synthesizing final response.")
+        logger.info("Workflow completed; synthesizing final response")
 
         return {
             "success": True,
@@ -441,6 +468,6 @@ class FinancialOrchestrator:
         """Get status of all agents and system health"""
         return {
             "orchestrator": "active",
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": iso_timestamp(),
             "agents": {name: {"status": "active"} for name in self.agents.keys()},
         }
@@ -10,6 +10,7 @@ import numpy as np
 from datetime import datetime, timedelta
 import logging
 import json
+import zlib
 
 logger = logging.getLogger(__name__)
 
@@ -25,16 +26,21 @@ def get_historical_data(
         # Try to import yfinance
         try:
             import yfinance as yf
-            print(f"✅ Using yfinance to fetch real data for {ticker}")
+            logger.debug("Fetching historical data for %s from yfinance", ticker)
             
             # Fetch data from yfinance
             stock = yf.Ticker(ticker)
             hist_data = stock.history(period=period, interval=interval)
             
             if hist_data.empty:
-                print(f"⚠️ No data found for {ticker}, generating sample data")
+                logger.warning("No data found for %s, generating sample data", ticker)
                 return _generate_sample_data(ticker, period)
             
+            # Round the OHLC block once and convert it with a single tolist() call
+            open_prices, high_prices, low_prices, close_prices = (
+                hist_data[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=np.float64).round(2).T.tolist()
+            )
+            
             # Convert to JSON-serializable format
             data = {
                 "ticker": ticker.upper(),
@@ -44,11 +50,11 @@ def get_historical_data(
                 "start_date": hist_data.index[0].strftime("%Y-%m-%d"),
                 "end_date": hist_data.index[-1].strftime("%Y-%m-%d"),
                 "prices": {
-                    "dates": [date.strftime("%Y-%m-%d") for date in hist_data.index],
-                    "open": hist_data['Open'].round(2).tolist(),
-                    "high": hist_data['High'].round(2).tolist(),
-                    "low": hist_data['Low'].round(2).tolist(),
-                    "close": hist_data['Close'].round(2).tolist(),
+                    "dates": hist_data.index.strftime("%Y-%m-%d").tolist(),
+                    "open": open_prices,
+                    "high": high_prices,
+                    "low": low_prices,
+                    "close": close_prices,
                     "volume": hist_data['Volume'].astype(int).tolist()
                 },
                 "returns": {
@@ -70,11 +76,11 @@ def get_historical_data(
             return data
             
         except ImportError:
-            print(f"⚠️ yfinance not installed, generating sample data for {ticker}")
+            logger.warning("yfinance not installed, generating sample data for %s", ticker)
             return _generate_sample_data(ticker, period)
             
     except Exception as e:
-        logger.error(f"Error fetching historical data for {ticker}: {str(e)}")
+        logger.error("Error fetching historical data for %s: %s", ticker, e)
         return {"error": str(e), "ticker": ticker}
 
 
@@ -88,14 +94,14 @@ def get_latest_news(
         # Try to import yfinance
         try:
             import yfinance as yf
-            print(f"✅ Using yfinance to fetch real news for {ticker}")
+            logger.debug("Fetching news for %s from yfinance", ticker)
             
             # Fetch news from yfinance
             stock = yf.Ticker(ticker)
             news = stock.news
             
             if not news:
-                print(f"⚠️ No news found for {ticker}, generating sample news")
+                logger.warning("No news found for %s, generating sample news", ticker)
                 return _generate_sample_news(ticker, max_articles)
             
             # Process news articles
@@ -121,11 +127,11 @@ def get_latest_news(
             }
             
         except ImportError:
-            print(f"⚠️ yfinance not installed, generating sample news for {ticker}")
+            logger.warning("yfinance not installed, generating sample news for %s", ticker)
             return _generate_sample_news(ticker, max_articles)
             
     except Exception as e:
-        logger.error(f"Error fetching news for {ticker}: {str(e)}")
+        logger.error("Error fetching news for %s: %s", ticker, e)
         return {"error": str(e), "ticker": ticker}
 
 
@@ -141,19 +147,24 @@ def _generate_sample_data(ticker: str, period: str) -> Dict[str, Any]:
     dates = pd.date_range(start=start_date, end=end_date, freq='D')[:num_days]
     
     # Generate realistic price movements
-    np.random.seed(hash(ticker) % 2**32)  # Deterministic based on ticker
-    initial_price = 100 + (hash(ticker) % 400)  # Price between 100-500
+    # Deterministic per ticker across processes (str hash() is salted per run);
+    # a local generator leaves the global NumPy RNG state untouched
+    seed = zlib.crc32(ticker.encode("utf-8"))
+    rng = np.random.default_rng(seed)
+    initial_price = 100 + (seed % 400)  # Price between 100-500
     
-    returns = np.random.normal(0.0005, 0.02, num_days)  # Daily returns
+    returns = rng.normal(0.0005, 0.02, num_days)  # Daily returns
     prices = initial_price * np.exp(np.cumsum(returns))
     
-    # Generate OHLC data
-    high_prices = prices * (1 + np.abs(np.random.normal(0, 0.01, num_days)))
-    low_prices = prices * (1 - np.abs(np.random.normal(0, 0.01, num_days)))
+    # Generate OHLC data (high/low noise drawn in one call)
+    noise = np.abs(rng.normal(0, 0.01, (2, num_days)))
+    high_prices = prices * (1 + noise[0])
+    low_prices = prices * (1 - noise[1])
     open_prices = np.roll(prices, 1)
     open_prices[0] = initial_price
     
-    volumes = np.random.randint(1000000, 10000000, num_days)
+    volumes = rng.integers(1000000, 10000000, num_days)
+    ohlc = np.vstack((open_prices, high_prices, low_prices, prices)).round(2).tolist()
     
     return {
         "ticker": ticker.upper(),
@@ -163,11 +174,11 @@ def _generate_sample_data(ticker: str, period: str) -> Dict[str, Any]:
         "start_date": dates[0].strftime("%Y-%m-%d"),
         "end_date": dates[-1].strftime("%Y-%m-%d"),
         "prices": {
-            "dates": [date.strftime("%Y-%m-%d") for date in dates],
-            "open": open_prices.round(2).tolist(),
-            "high": high_prices.round(2).tolist(),
-            "low": low_prices.round(2).tolist(),
-            "close": prices.round(2).tolist(),
+            "dates": dates.strftime("%Y-%m-%d").tolist(),
+            "open": ohlc[0],
+            "high": ohlc[1],
+            "low": ohlc[2],
+            "close": ohlc[3],
             "volume": volumes.tolist()
         },
         "returns": {
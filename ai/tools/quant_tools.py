@@ -8,46 +8,54 @@ from typing import Dict, List, Any, Optional, Union, Annotated
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from functools import lru_cache
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on random shocks held in memory at once by the Monte Carlo tool
+MONTE_CARLO_BLOCK_ELEMENTS = 1_000_000
 
+
+@lru_cache(maxsize=1)
 def safe_import_analysis_functions():
-    """Safely import analysis functions with fallbacks"""
+    """
+    Safely import analysis functions with fallbacks
+    Resolved on first tool call and reused afterwards, so importing this module stays cheap
+    """
     analysis_functions = {}
     
     try:
-        from analysis.fractal import calculate_hurst, generate_fbm_path
-        analysis_functions['calculate_hurst'] = calculate_hurst
+        from analysis.fractal import calculate_hurst_np, generate_fbm_path
+        analysis_functions['calculate_hurst'] = calculate_hurst_np
         analysis_functions['generate_fbm_path'] = generate_fbm_path
-        print("✅ Imported fractal analysis functions")
+        logger.debug("Imported fractal analysis functions")
     except ImportError as e:
-        logger.warning(f"Could not import fractal analysis: {e}")
+        logger.warning("Could not import fractal analysis: %s", e)
         analysis_functions['calculate_hurst'] = lambda data: 0.5
         analysis_functions['generate_fbm_path'] = lambda **kwargs: np.random.randn(252)
-        print("⚠️ Using fallback fractal functions")
+        logger.warning("Using fallback fractal functions")
     
     try:
-        from analysis.risk import calculate_cvar, fit_garch_forecast
-        analysis_functions['calculate_cvar'] = calculate_cvar
+        from analysis.risk import calculate_cvar_np, fit_garch_forecast
+        analysis_functions['calculate_cvar'] = calculate_cvar_np
         analysis_functions['fit_garch_forecast'] = fit_garch_forecast
-        print("✅ Imported risk analysis functions")
+        logger.debug("Imported risk analysis functions")
     except ImportError as e:
-        logger.warning(f"Could not import risk analysis: {e}")
+        logger.warning("Could not import risk analysis: %s", e)
         analysis_functions['calculate_cvar'] = lambda data, confidence_level=0.95: np.percentile(data, (1-confidence_level)*100)
         analysis_functions['fit_garch_forecast'] = lambda data, forecast_horizon=30: (pd.Series(np.random.randn(len(data))), pd.Series(np.random.randn(forecast_horizon)))
-        print("⚠️ Using fallback risk functions")
+        logger.warning("Using fallback risk functions")
     
     try:
         from analysis.regime import detect_hmm_regimes
         analysis_functions['detect_hmm_regimes'] = detect_hmm_regimes
-        print("✅ Imported regime analysis functions")
+        logger.debug("Imported regime analysis functions")
     except ImportError as e:
-        logger.warning(f"Could not import regime analysis: {e}")
+        logger.warning("Could not import regime analysis: %s", e)
         analysis_functions['detect_hmm_regimes'] = lambda data, n_regimes=3: (np.random.randint(0, n_regimes, len(data)), None)
-        print("⚠️ Using fallback regime functions")
+        logger.warning("Using fallback regime functions")
     
     return analysis_functions
 
@@ -63,16 +71,19 @@ def calculate_hurst_exponent(
         analysis_funcs = safe_import_analysis_functions()
         calculate_hurst = analysis_funcs['calculate_hurst']
         
-        series = pd.Series(data)
+        # The analysis functions take float64 arrays directly (no Series/Index needed)
+        values = np.asarray(data, dtype=np.float64)
         
         if window_size:
-            # Rolling Hurst calculation
-            rolling_hurst = series.rolling(window=window_size).apply(
-                lambda x: calculate_hurst(x) if len(x) >= 50 else np.nan
-            )
-            hurst_value = rolling_hurst.iloc[-1]
+            # Hurst of the most recent window only; this is the last value of the
+            # rolling calculation, without estimating every earlier window too
+            latest_window = values[-window_size:]
+            if len(values) < window_size or window_size < 50 or np.isnan(latest_window).any():
+                hurst_value = np.nan
+            else:
+                hurst_value = calculate_hurst(latest_window)
         else:
-            hurst_value = calculate_hurst(series)
+            hurst_value = calculate_hurst(values)
         
         # Interpret result
         if hurst_value < 0.45:
@@ -109,13 +120,13 @@ def calculate_cvar(
         analysis_funcs = safe_import_analysis_functions()
         calculate_cvar_func = analysis_funcs['calculate_cvar']
         
-        returns_series = pd.Series(returns)
-        cvar_value = calculate_cvar_func(returns_series, confidence_level)
+        returns_array = np.asarray(returns, dtype=np.float64)
+        cvar_value = calculate_cvar_func(returns_array, confidence_level)
         
         # Additional risk metrics
-        var_value = np.percentile(returns, (1 - confidence_level) * 100)
-        mean_return = np.mean(returns)
-        volatility = np.std(returns)
+        var_value = np.percentile(returns_array, (1 - confidence_level) * 100)
+        mean_return = np.mean(returns_array)
+        volatility = np.std(returns_array)
         
         return {
             "cvar": float(cvar_value),
@@ -143,8 +154,9 @@ def forecast_volatility_garch(
         analysis_funcs = safe_import_analysis_functions()
         fit_garch_forecast = analysis_funcs['fit_garch_forecast']
         
-        # Create series with simple integer index to avoid date issues
-        returns_series = pd.Series(returns, index=range(len(returns)))
+        # Plain RangeIndex: fit_garch_forecast then skips building calendar dates.
+        # arch runs the GARCH variance recursion in its compiled extension.
+        returns_series = pd.Series(np.asarray(returns, dtype=np.float64))
         in_sample_vol, forecast_vol = fit_garch_forecast(returns_series, forecast_horizon)
         
         return {
@@ -159,16 +171,17 @@ def forecast_volatility_garch(
     except Exception as e:
         logger.error(f"Error in GARCH forecasting: {str(e)}")
         # Fallback: Simple rolling volatility forecast
-        returns_array = np.array(returns)
+        returns_array = np.asarray(returns, dtype=np.float64)
         rolling_vol = pd.Series(returns_array).rolling(30).std() * np.sqrt(252)
         current_vol = rolling_vol.iloc[-1] if not pd.isna(rolling_vol.iloc[-1]) else 0.2
         
         # Simple forecast: assume volatility persists with slight mean reversion
-        forecast_vols = [current_vol * (0.98 ** i) + 0.2 * (1 - 0.98 ** i) for i in range(forecast_horizon)]
+        decay = 0.98 ** np.arange(forecast_horizon)
+        forecast_vols = current_vol * decay + 0.2 * (1 - decay)
         
         return {
             "in_sample_volatility": rolling_vol.dropna().tolist(),
-            "forecast_volatility": forecast_vols,
+            "forecast_volatility": forecast_vols.tolist(),
             "forecast_horizon": forecast_horizon,
             "current_volatility": float(current_vol),
             "mean_forecast_volatility": float(np.mean(forecast_vols)),
@@ -273,30 +286,31 @@ def run_monte_carlo_simulation(
         drift = mean_return * dt
         diffusion = volatility * np.sqrt(dt)
         
-        final_values = []
-        for _ in range(num_simulations):
-            path = [initial_value]
-            for _ in range(time_horizon):
-                random_shock = np.random.normal(0, 1)
-                next_value = path[-1] * (1 + drift + diffusion * random_shock)
-                path.append(next_value)
-            final_values.append(path[-1])
+        # Only final values are needed, so paths are never materialized:
+        # each block of simulations is reduced with a product over its shocks
+        final_values = np.empty(num_simulations)
+        block_size = max(1, MONTE_CARLO_BLOCK_ELEMENTS // max(time_horizon, 1))
+        for start in range(0, num_simulations, block_size):
+            stop = min(start + block_size, num_simulations)
+            random_shocks = np.random.normal(0, 1, (stop - start, time_horizon))
+            final_values[start:stop] = initial_value * np.prod(1 + drift + diffusion * random_shocks, axis=1)
         
-        final_values = np.array(final_values)
+        # All quantiles from one selection pass over the final values
+        var_99, var_95, median_final = np.percentile(final_values, [1, 5, 50])
         
         return {
             "simulation_results": {
                 "mean_final_value": float(np.mean(final_values)),
-                "median_final_value": float(np.median(final_values)),
+                "median_final_value": float(median_final),
                 "std_final_value": float(np.std(final_values)),
                 "min_final_value": float(np.min(final_values)),
                 "max_final_value": float(np.max(final_values))
             },
             "risk_metrics": {
-                "var_95": float(np.percentile(final_values, 5)),
-                "var_99": float(np.percentile(final_values, 1)),
+                "var_95": float(var_95),
+                "var_99": float(var_99),
                 "probability_of_loss": float(np.mean(final_values < initial_value)),
-                "expected_shortfall_95": float(np.mean(final_values[final_values <= np.percentile(final_values, 5)]))
+                "expected_shortfall_95": float(np.mean(final_values[final_values <= var_95]))
             },
             "simulation_parameters": {
                 "initial_value": initial_value,
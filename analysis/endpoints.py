@@ -1,22 +1,37 @@
 # analysis/endpoints.py - CREATE THIS NEW FILE
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import Response
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+import asyncio
+import base64
 import logging
-from datetime import datetime
+import hashlib
+from types import MappingProxyType
+import time
 import numpy as np
+import pandas as pd
 import json
+from sqlalchemy.orm import Session
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Import your existing auth dependency (matching your structure)
 from auth.endpoints import get_current_active_user
-from models.user import UserInDB
+from core.database import get_db
+from models.user import User
+from utils.inflight import join_inflight
+from utils.response_cache import encode_json, ttl_get, ttl_put
 
 # Import your existing analysis functions
 # Only import functions that actually exist in your analysis.risk module
 try:
-    from analysis.risk import calculate_cvar
+    from analysis.risk import calculate_cvar_np
 except ImportError:
-    calculate_cvar = None
+    calculate_cvar_np = None
 
 try:
     from analysis.risk import forecast_portfolio_volatility
@@ -41,8 +56,6 @@ except ImportError:
 # For Hurst exponent, use a different approach since it's not available
 def calculate_hurst_exponent(prices):
     """Simple Hurst exponent calculation fallback"""
-    import numpy as np
-    
     # Simple R/S analysis implementation
     N = len(prices)
     if N < 100:
@@ -56,7 +69,7 @@ def calculate_hurst_exponent(prices):
         }
     
     # Convert to log returns
-    log_returns = np.diff(np.log(prices))
+    log_returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)))
     
     # Calculate Hurst using simplified R/S method
     lags = range(2, min(N//4, 100))
@@ -110,6 +123,7 @@ def calculate_hurst_exponent(prices):
 
 # Import your portfolio functions
 from models.portfolio import get_user_portfolio
+from utils.timestamps import iso_timestamp
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -118,22 +132,211 @@ logger = logging.getLogger(__name__)
 analysis_router = APIRouter(prefix="/api/v1/analysis", tags=["analysis"])
 
 
+# ================================
+# RESULT CACHE
+# ================================
+
+# Deterministic endpoints (CVaR, Hurst, regime detection) are pure functions of
+# their inputs, so identical payloads (e.g. UI refreshes) are answered from this
+# cache instead of recomputing. The GARCH forecast draws random jitter per call
+# and is never cached here.
+# Entries hold the encoded JSON body, so hits skip serialization as well.
+_RESULT_CACHE_TTL_SECONDS = 300
+_RESULT_CACHE_MAX_SIZE = 1024
+_result_cache: Dict[str, tuple] = {}
+
+def _result_cache_key(namespace: str, payload: Dict[str, Any]) -> str:
+    """Build a cache key from a hash of the serialized request inputs"""
+    if orjson is not None:
+        serialized = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        serialized = json.dumps(
+            payload, sort_keys=True, separators=(",", ":"), default=lambda value: value.tolist()
+        ).encode("utf-8")
+    return f"{namespace}:{hashlib.blake2b(serialized, digest_size=16).hexdigest()}"
+
+def _json_response(body: bytes) -> Response:
+    """Wrap an already-encoded JSON body, bypassing FastAPI's response encoding"""
+    return Response(content=body, media_type="application/json")
+
+def _cache_store(key: str, body: bytes, now: float, ttl_seconds: float) -> None:
+    """Store an encoded body in the bounded result cache"""
+    ttl_put(_result_cache, key, body, now + ttl_seconds, now, _RESULT_CACHE_MAX_SIZE)
+
+def _cached_result(namespace: str, payload: Dict[str, Any], compute: Callable[[], Dict[str, Any]]) -> Response:
+    """Return the cached response for payload, computing and storing it on a miss"""
+    key = _result_cache_key(namespace, payload)
+    now = time.monotonic()
+    cached = ttl_get(_result_cache, key, now)
+    if cached is not None:
+        return _json_response(cached)
+
+    result = encode_json(compute())
+    _cache_store(key, result, now, _RESULT_CACHE_TTL_SECONDS)
+    return _json_response(result)
+
+async def _cached_blocking_result(
+    namespace: str, payload: Dict[str, Any], compute: Callable[[], Dict[str, Any]]
+) -> Response:
+    """_cached_result for CPU-heavy analytics: misses are computed and encoded in the
+    default thread pool so a long calculation does not stall the event loop"""
+    key = _result_cache_key(namespace, payload)
+    cached = ttl_get(_result_cache, key, time.monotonic())
+    if cached is not None:
+        return _json_response(cached)
+
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(None, lambda: encode_json(compute()))
+    _cache_store(key, result, time.monotonic(), _RESULT_CACHE_TTL_SECONDS)
+    return _json_response(result)
+
+# Results that depend on live market data go stale faster than pure computations
+_MARKET_RESULT_TTL_SECONDS = 60
+
+# Market computations in progress, so concurrent identical requests share one
+# computation and one encoded body
+_inflight_results: Dict[str, asyncio.Future] = {}
+
+async def _compute_and_store(key: str, compute: Callable[[], Awaitable[Dict[str, Any]]]) -> bytes:
+    """Run compute once, encode the result and cache the bytes"""
+    body = encode_json(await compute())
+    _cache_store(key, body, time.monotonic(), _MARKET_RESULT_TTL_SECONDS)
+    return body
+
+async def _cached_market_result(
+    namespace: str, payload: Dict[str, Any], compute: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Response:
+    """Async _cached_result for market-dependent analytics, keyed on a portfolio snapshot"""
+    key = _result_cache_key(namespace, payload)
+    cached = ttl_get(_result_cache, key, time.monotonic())
+    if cached is not None:
+        return _json_response(cached)
+
+    return _json_response(await join_inflight(_inflight_results, key, lambda: _compute_and_store(key, compute)))
+
+def _portfolio_snapshot(positions) -> List[List[Any]]:
+    """Fields that determine a portfolio-level analysis, in a stable order for hashing"""
+    return sorted(
+        [
+            str(pos.get("symbol")),
+            pos.get("quantity"),
+            pos.get("market_value"),
+            pos.get("total_cost_basis"),
+        ]
+        for pos in positions
+    )
+
+
+def _positions_as_dicts(positions) -> List[Dict[str, Any]]:
+    """
+    Plain dicts for the analysis functions, built in one pass. ORM rows use their
+    hand-written to_dict(); Pydantic models fall back to model_dump().
+    """
+    return [
+        pos.to_dict() if hasattr(pos, "to_dict")
+        else pos.model_dump() if hasattr(pos, "model_dump")
+        else pos.dict()
+        for pos in positions
+    ]
+
+
+# ================================
+# NUMERIC PAYLOADS
+# ================================
+
+def _float64_from_bytes(raw: bytes) -> np.ndarray:
+    """View raw little-endian float64 bytes as an array without per-item validation"""
+    if len(raw) % 8:
+        raise HTTPException(status_code=400, detail="Binary payload must be little-endian float64 values")
+    return np.frombuffer(raw, dtype="<f8")
+
+# read_float_array reads the raw body, so routes using it declare the accepted forms here
+FLOAT_ARRAY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "oneOf": [
+                        {"type": "array", "items": {"type": "number"}},
+                        {
+                            "type": "string",
+                            "format": "byte",
+                            "description": "Base64-encoded little-endian float64 values"
+                        }
+                    ]
+                }
+            },
+            "application/octet-stream": {
+                "schema": {
+                    "type": "string",
+                    "format": "binary",
+                    "description": "Raw little-endian float64 values"
+                }
+            }
+        }
+    }
+}
+
+async def read_float_array(request: Request) -> np.ndarray:
+    """
+    Read a 1-D numeric request body straight into a float64 array
+    
+    Accepts a JSON array of numbers, a JSON string holding base64-encoded
+    little-endian float64 values, or the raw bytes sent as
+    application/octet-stream (a single memcpy instead of validating each float).
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/octet-stream"):
+        return _float64_from_bytes(body)
+    
+    try:
+        parsed = orjson.loads(body) if orjson is not None else json.loads(body)
+        if isinstance(parsed, str):
+            return _float64_from_bytes(base64.b64decode(parsed, validate=True))
+        values = np.asarray(parsed, dtype=np.float64)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON array of numbers or a base64 float64 string")
+    if values.ndim != 1:
+        raise HTTPException(status_code=422, detail="Request body must be a JSON array of numbers or a base64 float64 string")
+    return values
+
+
+# ================================
+# STOCK INPUTS
+# ================================
+
+# Read-only defaults shared by every request instead of rebuilt per call
+DEFAULT_STRESS_SCENARIOS = (
+    MappingProxyType({"market_shock": -0.20, "volatility_spike": 2.0, "name": "2008 Financial Crisis"}),
+    MappingProxyType({"market_shock": -0.35, "volatility_spike": 3.0, "name": "COVID-19 Crash"}),
+    MappingProxyType({"market_shock": -0.15, "volatility_spike": 1.5, "name": "Mild Recession"}),
+    MappingProxyType({"market_shock": 0.10, "volatility_spike": 0.8, "name": "Bull Market Rally"}),
+)
+
+SAMPLE_BETA_PORTFOLIO = (
+    MappingProxyType({"symbol": "AAPL", "total_cost_basis": 25000}),
+    MappingProxyType({"symbol": "GOOGL", "total_cost_basis": 30000}),
+    MappingProxyType({"symbol": "TSLA", "total_cost_basis": 20000}),
+)
+
+
 # ================================
 # RISK ANALYSIS ENDPOINTS
 # ================================
 
-@analysis_router.post("/risk/cvar")
+@analysis_router.post("/risk/cvar", openapi_extra=FLOAT_ARRAY_OPENAPI)
 async def calculate_portfolio_cvar(
-    returns: List[float],
+    returns: np.ndarray = Depends(read_float_array),
     confidence_level: float = 0.95,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Calculate Conditional Value at Risk (CVaR) for given returns"""
     try:
-        if calculate_cvar is None:
-            raise HTTPException(status_code=501, detail="CVaR calculation not available - missing analysis.risk.calculate_cvar function")
+        if calculate_cvar_np is None:
+            raise HTTPException(status_code=501, detail="CVaR calculation not available - missing analysis.risk.calculate_cvar_np function")
             
-        if not returns or len(returns) < 30:
+        if len(returns) < 30:
             raise HTTPException(
                 status_code=400, 
                 detail="Insufficient data: Need at least 30 return observations for CVaR calculation"
@@ -145,20 +348,21 @@ async def calculate_portfolio_cvar(
                 detail="Confidence level must be between 0 and 1"
             )
         
-        # Convert to pandas Series for calculation
-        import pandas as pd
-        returns_series = pd.Series(returns)
-        
-        # Calculate CVaR using your existing function
-        cvar_result = calculate_cvar(returns_series, confidence_level)
-        
-        return {
-            "success": True,
-            "cvar": float(cvar_result),
-            "confidence_level": confidence_level,
-            "data_points": len(returns),
-            "interpretation": f"Expected loss in worst {(1-confidence_level)*100:.0f}% of scenarios: {cvar_result:.2%}"
-        }
+        def compute_cvar() -> Dict[str, Any]:
+            # Calculate CVaR directly on a float64 array (no pandas Series needed)
+            cvar_result = calculate_cvar_np(returns, confidence_level)
+            
+            return {
+                "success": True,
+                "cvar": float(cvar_result),
+                "confidence_level": confidence_level,
+                "data_points": len(returns),
+                "interpretation": f"Expected loss in worst {(1-confidence_level)*100:.0f}% of scenarios: {cvar_result:.2%}"
+            }
+        
+        return _cached_result(
+            "cvar", {"returns": returns, "confidence_level": confidence_level}, compute_cvar
+        )
         
     except Exception as e:
         logger.error(f"CVaR calculation failed for user {current_user.email}: {str(e)}")
@@ -169,29 +373,22 @@ async def calculate_portfolio_cvar(
 async def perform_stress_test(
     portfolio_data: Optional[List[Dict[str, Any]]] = None,
     stress_scenarios: Optional[List[Dict[str, float]]] = None,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """Perform stress testing on portfolio"""
     try:
         # If no portfolio data provided, fetch user's actual portfolio
         if not portfolio_data:
-            user_positions = get_user_portfolio(current_user.email)
+            user_positions = get_user_portfolio(db, current_user.id)
             if not user_positions:
                 raise HTTPException(status_code=400, detail="No portfolio data available")
             
-            portfolio_data = []
-            for pos in user_positions:
-                pos_dict = pos.model_dump() if hasattr(pos, 'model_dump') else pos.dict()
-                portfolio_data.append(pos_dict)
+            portfolio_data = _positions_as_dicts(user_positions)
         
         # Default stress scenarios if not provided
         if not stress_scenarios:
-            stress_scenarios = [
-                {"market_shock": -0.20, "volatility_spike": 2.0, "name": "2008 Financial Crisis"},
-                {"market_shock": -0.35, "volatility_spike": 3.0, "name": "COVID-19 Crash"},
-                {"market_shock": -0.15, "volatility_spike": 1.5, "name": "Mild Recession"},
-                {"market_shock": 0.10, "volatility_spike": 0.8, "name": "Bull Market Rally"}
-            ]
+            stress_scenarios = DEFAULT_STRESS_SCENARIOS
         
         stress_results = []
         total_value = sum(pos.get('total_cost_basis', 0) for pos in portfolio_data)
@@ -236,31 +433,35 @@ async def perform_stress_test(
 # FRACTAL ANALYSIS ENDPOINTS
 # ================================
 
-@analysis_router.post("/fractal/hurst-exponent")
+@analysis_router.post("/fractal/hurst-exponent", openapi_extra=FLOAT_ARRAY_OPENAPI)
 async def calculate_hurst_analysis(
-    prices: List[float],
-    current_user: UserInDB = Depends(get_current_active_user)
+    prices: np.ndarray = Depends(read_float_array),
+    current_user: User = Depends(get_current_active_user)
 ):
     """Calculate Hurst Exponent for trend persistence analysis"""
     try:
-        if not prices or len(prices) < 100:
+        if len(prices) < 100:
             raise HTTPException(
                 status_code=400,
                 detail="Insufficient data: Need at least 100 price observations for reliable Hurst calculation"
             )
         
-        # Calculate Hurst exponent using your existing function
-        hurst_result = calculate_hurst_exponent(prices)
-        
-        return {
-            "success": True,
-            "hurst_exponent": hurst_result.get('hurst_exponent'),
-            "data_points": hurst_result.get('data_points'),
-            "interpretation": hurst_result.get('interpretation'),
-            "r_squared": hurst_result.get('r_squared'),
-            "confidence": hurst_result.get('confidence'),
-            "trading_implication": hurst_result.get('trading_implication')
-        }
+        def compute_hurst() -> Dict[str, Any]:
+            # Calculate Hurst exponent using your existing function
+            hurst_result = calculate_hurst_exponent(prices)
+            
+            return {
+                "success": True,
+                "hurst_exponent": hurst_result.get('hurst_exponent'),
+                "data_points": hurst_result.get('data_points'),
+                "interpretation": hurst_result.get('interpretation'),
+                "r_squared": hurst_result.get('r_squared'),
+                "confidence": hurst_result.get('confidence'),
+                "trading_implication": hurst_result.get('trading_implication')
+            }
+        
+        # R/S analysis grows with the series length, so it runs off the event loop
+        return await _cached_blocking_result("hurst", {"prices": prices}, compute_hurst)
         
     except HTTPException:
         raise
@@ -277,7 +478,8 @@ async def calculate_hurst_analysis(
 async def calculate_garch_forecast(
     portfolio_data: Optional[List[Dict[str, Any]]] = None,
     forecast_horizon: int = 30,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """Generate GARCH volatility forecast for portfolio"""
     try:
@@ -286,14 +488,11 @@ async def calculate_garch_forecast(
             
         # If no portfolio data provided, fetch user's actual portfolio
         if not portfolio_data:
-            user_positions = get_user_portfolio(current_user.email)
+            user_positions = get_user_portfolio(db, current_user.id)
             if not user_positions:
                 raise HTTPException(status_code=400, detail="No portfolio data available")
             
-            portfolio_data = []
-            for pos in user_positions:
-                pos_dict = pos.model_dump() if hasattr(pos, 'model_dump') else pos.dict()
-                portfolio_data.append(pos_dict)
+            portfolio_data = _positions_as_dicts(user_positions)
         
         if not 1 <= forecast_horizon <= 252:
             raise HTTPException(
@@ -301,21 +500,25 @@ async def calculate_garch_forecast(
                 detail="Forecast horizon must be between 1 and 252 days"
             )
         
-        # Use your existing volatility forecasting function
-        forecast_result = forecast_portfolio_volatility(portfolio_data, forecast_horizon)
-        
-        if not forecast_result.get("success"):
-            raise HTTPException(
-                status_code=400,
-                detail=forecast_result.get("error", "Volatility forecast failed")
-            )
+        def compute_forecast() -> Dict[str, Any]:
+            # Use your existing volatility forecasting function
+            forecast_result = forecast_portfolio_volatility(portfolio_data, forecast_horizon)
+            
+            if not forecast_result.get("success"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=forecast_result.get("error", "Volatility forecast failed")
+                )
+            
+            return {
+                "success": True,
+                "forecast_data": forecast_result,
+                "model_type": "GARCH(1,1)",
+                "forecast_horizon_days": forecast_horizon
+            }
         
-        return {
-            "success": True,
-            "forecast_data": forecast_result,
-            "model_type": "GARCH(1,1)",
-            "forecast_horizon_days": forecast_horizon
-        }
+        # Each forecast draws fresh jitter, so results are not cached
+        return _json_response(encode_json(compute_forecast()))
         
     except HTTPException:
         raise
@@ -328,59 +531,66 @@ async def calculate_garch_forecast(
 # REGIME DETECTION ENDPOINT
 # ================================
 
-@analysis_router.post("/regime/detect")
+@analysis_router.post("/regime/detect", openapi_extra=FLOAT_ARRAY_OPENAPI)
 async def detect_market_regime(
-    returns: List[float],
+    returns: np.ndarray = Depends(read_float_array),
     lookback_window: int = 252,
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Detect market regime (bull/bear/sideways)"""
     try:
-        if not returns or len(returns) < 60:
+        if len(returns) < 60:
             raise HTTPException(
                 status_code=400,
                 detail="Insufficient data: Need at least 60 returns for regime detection"
             )
         
-        returns_array = np.array(returns)
-        recent_returns = returns_array[-min(lookback_window, len(returns_array)):]
-        
-        # Calculate regime indicators
-        mean_return = np.mean(recent_returns)
-        volatility = np.std(recent_returns)
-        trend_strength = abs(mean_return) / volatility if volatility > 0 else 0
-        
-        # Determine regime
-        if mean_return > 0.001 and trend_strength > 0.1:
-            regime = "bull_market"
-            confidence = min(trend_strength * 10, 1.0)
-        elif mean_return < -0.001 and trend_strength > 0.1:
-            regime = "bear_market" 
-            confidence = min(trend_strength * 10, 1.0)
-        else:
-            regime = "sideways_market"
-            confidence = max(0.3, 1.0 - trend_strength)
-        
-        # Calculate volatility trend
-        rolling_vol = []
-        window_size = min(30, len(recent_returns) // 4)
-        for i in range(window_size, len(recent_returns)):
-            window_vol = np.std(recent_returns[i-window_size:i])
-            rolling_vol.append(window_vol)
-        
-        vol_trend = "increasing" if len(rolling_vol) > 1 and rolling_vol[-1] > rolling_vol[0] else "decreasing"
-        
-        return {
-            "success": True,
-            "current_regime": regime,
-            "confidence": round(confidence, 3),
-            "mean_return": round(mean_return, 6),
-            "volatility": round(volatility, 4),
-            "trend_strength": round(trend_strength, 3),
-            "volatility_trend": vol_trend,
-            "data_points": len(recent_returns),
-            "interpretation": f"Market appears to be in {regime.replace('_', ' ')} with {confidence:.1%} confidence"
-        }
+        def compute_regime() -> Dict[str, Any]:
+            returns_array = returns
+            recent_returns = returns_array[-min(lookback_window, len(returns_array)):]
+        
+            # Calculate regime indicators
+            mean_return = np.mean(recent_returns)
+            volatility = np.std(recent_returns)
+            trend_strength = abs(mean_return) / volatility if volatility > 0 else 0
+        
+            # Determine regime
+            if mean_return > 0.001 and trend_strength > 0.1:
+                regime = "bull_market"
+                confidence = min(trend_strength * 10, 1.0)
+            elif mean_return < -0.001 and trend_strength > 0.1:
+                regime = "bear_market" 
+                confidence = min(trend_strength * 10, 1.0)
+            else:
+                regime = "sideways_market"
+                confidence = max(0.3, 1.0 - trend_strength)
+        
+            # Volatility trend: compare the first and last rolling windows
+            # (the windows in between never affect the result)
+            window_size = min(30, len(recent_returns) // 4)
+            n_windows = len(recent_returns) - window_size
+            if n_windows > 1:
+                first_vol = np.std(recent_returns[:window_size])
+                last_vol = np.std(recent_returns[n_windows - 1:n_windows - 1 + window_size])
+                vol_trend = "increasing" if last_vol > first_vol else "decreasing"
+            else:
+                vol_trend = "decreasing"
+        
+            return {
+                "success": True,
+                "current_regime": regime,
+                "confidence": round(confidence, 3),
+                "mean_return": round(mean_return, 6),
+                "volatility": round(volatility, 4),
+                "trend_strength": round(trend_strength, 3),
+                "volatility_trend": vol_trend,
+                "data_points": len(recent_returns),
+                "interpretation": f"Market appears to be in {regime.replace('_', ' ')} with {confidence:.1%} confidence"
+            }
+        
+        return _cached_result(
+            "regime", {"returns": returns, "lookback_window": lookback_window}, compute_regime
+        )
         
     except HTTPException:
         raise
@@ -396,7 +606,7 @@ async def detect_market_regime(
 @analysis_router.get("/portfolio/multi-var")
 async def calculate_portfolio_var(
     confidence_levels: str = "0.90,0.95,0.99",
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user)
 ):
     """Calculate Value at Risk at multiple confidence levels for user's portfolio"""
     try:
@@ -404,7 +614,7 @@ async def calculate_portfolio_var(
         conf_levels = [float(x.strip()) for x in confidence_levels.split(",")]
         
         # Generate simulated returns (in production, use real portfolio returns)
-        simulated_returns = list(np.random.normal(0.0008, 0.02, 252))
+        simulated_returns = pd.Series(np.random.normal(0.0008, 0.02, 252))
         
         var_result = calculate_multi_level_var(simulated_returns, conf_levels)
         
@@ -420,6 +630,8 @@ async def calculate_portfolio_var(
             "confidence_levels": conf_levels
         }
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid confidence levels format: {str(e)}")
     except Exception as e:
@@ -429,38 +641,38 @@ async def calculate_portfolio_var(
 
 @analysis_router.get("/portfolio/beta")
 async def calculate_portfolio_beta_analysis(
-    current_user: UserInDB = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """Calculate portfolio beta relative to market"""
     try:
         # Fetch user's actual portfolio
-        user_positions = get_user_portfolio(current_user.email)
+        user_positions = get_user_portfolio(db, current_user.id)
         
         if not user_positions:
             # Use sample data if no portfolio
-            sample_portfolio = [
-                {"symbol": "AAPL", "total_cost_basis": 25000},
-                {"symbol": "GOOGL", "total_cost_basis": 30000},
-                {"symbol": "TSLA", "total_cost_basis": 20000}
-            ]
+            sample_portfolio = SAMPLE_BETA_PORTFOLIO
         else:
-            sample_portfolio = []
-            for pos in user_positions:
-                pos_dict = pos.model_dump() if hasattr(pos, 'model_dump') else pos.dict()
-                sample_portfolio.append(pos_dict)
-        
-        beta_result = calculate_portfolio_beta(sample_portfolio)
+            sample_portfolio = _positions_as_dicts(user_positions)
         
-        if not beta_result.get("success"):
-            raise HTTPException(
-                status_code=400,
-                detail=beta_result.get("error", "Beta calculation failed")
-            )
+        async def compute_beta():
+            beta_result = await calculate_portfolio_beta(sample_portfolio)
+            
+            if not beta_result.get("success"):
+                raise HTTPException(
+                    status_code=400,
+                    detail=beta_result.get("error", "Beta calculation failed")
+                )
+            
+            return {
+                "success": True,
+                "beta_analysis": beta_result
+            }
         
-        return {
-            "success": True,
-            "beta_analysis": beta_result
-        }
+        # Identical holdings share one result for a minute; failures are not cached
+        return await _cached_market_result(
+            "portfolio_beta", {"positions": _portfolio_snapshot(sample_portfolio)}, compute_beta
+        )
         
     except HTTPException:
         raise
@@ -473,19 +685,20 @@ async def calculate_portfolio_beta_analysis(
 # HEALTH CHECK ENDPOINT
 # ================================
 
+_HEALTH_TEMPLATE = {
+    "status": "healthy",
+    "available_endpoints": (
+        "/risk/cvar",
+        "/risk/stress-test", 
+        "/fractal/hurst-exponent",
+        "/volatility/garch",
+        "/regime/detect",
+        "/portfolio/multi-var",
+        "/portfolio/beta"
+    ),
+}
+
 @analysis_router.get("/health")
 async def analysis_health_check():
     """Health check for analysis endpoints"""
-    return {
-        "status": "healthy",
-        "available_endpoints": [
-            "/risk/cvar",
-            "/risk/stress-test", 
-            "/fractal/hurst-exponent",
-            "/volatility/garch",
-            "/regime/detect",
-            "/portfolio/multi-var",
-            "/portfolio/beta"
-        ],
-        "timestamp": datetime.now().isoformat()
-    }
\ No newline at end of file
+    return {**_HEALTH_TEMPLATE, "timestamp": iso_timestamp()}
\ No newline at end of file
@@ -8,12 +8,16 @@ and Multifractal Spectrum Analysis.
 
 Key Functions:
 - calculate_hurst: Estimates the Hurst exponent using Rescaled Range (R/S) analysis.
+- calculate_hurst_np: The same estimator for raw float64 arrays (no pandas overhead).
 - calculate_dfa: Estimates the scaling exponent using Detrended Fluctuation Analysis.
 - calculate_multifractal_spectrum: Computes the multifractal spectrum f(α) vs α.
-- generate_fbm_path: Simulates realistic price paths using Fractional Brownian Motion.
+- generate_fbm_path: Simulates realistic price paths (one or many) using Fractional Brownian Motion.
 
 Dependencies:
-    pip install numpy pandas matplotlib fbm scipy
+    pip install numpy pandas matplotlib scipy
+
+Optional Dependencies:
+    pip install numba           # JIT-compiled R/S kernel
 
 Author: Quant Platform Development
 Date: 2025-07-31
@@ -23,12 +27,91 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from typing import Union, Tuple, Dict, Optional
-from fbm import FBM
 from scipy import stats
+from scipy import fft as sp_fft
 import warnings
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
 # --- Core Hurst Exponent Calculation ---
 
+def _rs_means_kernel(series: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """
+    Mean rescaled range over every start offset, for each window size.
+    
+    The window mean comes from a running sum; the cumulative deviation range
+    and the sum of squares are gathered in one pass over each window.
+    NaN marks windows where no offset had a positive standard deviation.
+    """
+    n = series.shape[0]
+    rs_means = np.full(windows.shape[0], np.nan)
+    for w in range(windows.shape[0]):
+        window = windows[w]
+        window_sum = 0.0
+        for i in range(window):
+            window_sum += series[i]
+        
+        rs_total = 0.0
+        rs_count = 0
+        for start in range(n - window + 1):
+            if start > 0:
+                window_sum += series[start + window - 1] - series[start - 1]
+            mean = window_sum / window
+            
+            cum_dev = 0.0
+            cum_min = np.inf
+            cum_max = -np.inf
+            sum_sq = 0.0
+            for i in range(start, start + window):
+                deviation = series[i] - mean
+                cum_dev += deviation
+                sum_sq += deviation * deviation
+                if cum_dev < cum_min:
+                    cum_min = cum_dev
+                if cum_dev > cum_max:
+                    cum_max = cum_dev
+            
+            std = np.sqrt(sum_sq / (window - 1))
+            if std > 0:
+                rs_total += (cum_max - cum_min) / std
+                rs_count += 1
+        
+        if rs_count > 0:
+            rs_means[w] = rs_total / rs_count
+    return rs_means
+
+if NUMBA_AVAILABLE:
+    _rs_means_kernel = njit(cache=True)(_rs_means_kernel)
+
+# Upper bound on window elements materialized at once by the NumPy fallback
+_RS_BLOCK_ELEMENTS = 1_000_000
+
+def _rs_means_numpy(series: np.ndarray, windows: np.ndarray) -> np.ndarray:
+    """NumPy fallback for _rs_means_kernel over strided window views, in bounded blocks."""
+    rs_means = np.full(windows.shape[0], np.nan)
+    for w, window in enumerate(windows):
+        views = np.lib.stride_tricks.sliding_window_view(series, window)
+        block = max(1, _RS_BLOCK_ELEMENTS // window)
+        rs_total = 0.0
+        rs_count = 0
+        for start in range(0, views.shape[0], block):
+            chunk = views[start:start + block]
+            deviations = chunk - chunk.mean(axis=1, keepdims=True)
+            cum_dev = np.cumsum(deviations, axis=1)
+            ranges = cum_dev.max(axis=1) - cum_dev.min(axis=1)
+            stds = chunk.std(axis=1, ddof=1)
+            positive = stds > 0
+            rs_total += np.sum(ranges[positive] / stds[positive])
+            rs_count += np.count_nonzero(positive)
+        if rs_count > 0:
+            rs_means[w] = rs_total / rs_count
+    return rs_means
+
 def calculate_hurst(series: pd.Series, 
                     min_window: int = 10, 
                     max_window: Optional[int] = None) -> float:
@@ -52,44 +135,52 @@ def calculate_hurst(series: pd.Series,
         - H = 0.5: Random walk (no memory)
         - H > 0.5: Trending (persistent)
     """
-    if len(series) < 20:
+    return calculate_hurst_np(series.to_numpy(dtype=np.float64), min_window, max_window)
+
+def calculate_hurst_np(values: np.ndarray, 
+                       min_window: int = 10, 
+                       max_window: Optional[int] = None) -> float:
+    """
+    Calculate the Hurst exponent from a raw float64 array.
+    
+    Same R/S analysis as calculate_hurst, without the pandas Series
+    scaffolding; NaN values are dropped.
+    
+    Parameters:
+    -----------
+    values : np.ndarray
+        Time series data (e.g., price returns, log prices).
+    min_window : int, default=10
+        Minimum window size for R/S calculation.
+    max_window : int or None, default=None
+        Maximum window size. If None, uses len(values)//2.
+        
+    Returns:
+    --------
+    float
+        Hurst exponent (H), clipped to [0.01, 0.99].
+    """
+    if len(values) < 20:
         raise ValueError("Series too short for reliable Hurst calculation (minimum 20 points)")
     
-    series = series.dropna()
+    series = values[~np.isnan(values)]
     if max_window is None:
         max_window = len(series) // 2
     
-    windows = np.unique(np.logspace(np.log10(min_window), np.log10(max_window), 20).astype(int))
-    
-    rs_values = []
-    window_sizes = [] # <-- FIX: This list is crucial for correct regression
+    windows = np.unique(np.logspace(np.log10(min_window), np.log10(max_window), 20).astype(np.int64))
+    windows = windows[(windows >= min_window) & (windows <= len(series))]
     
-    for window in windows:
-        if window < min_window or window > len(series): continue
-        
-        rs_window = []
-        # Use a simple step of 1 for robustness
-        for start in range(0, len(series) - window + 1):
-            sub_series = series.iloc[start : start + window]
-            if len(sub_series) < window: continue
-            
-            mean_centered = sub_series - sub_series.mean()
-            cum_dev = mean_centered.cumsum()
-            R = cum_dev.max() - cum_dev.min()
-            S = sub_series.std()
-            
-            if S > 0:
-                rs_window.append(R / S)
-        
-        if rs_window:
-            rs_values.append(np.mean(rs_window))
-            window_sizes.append(window) # <-- FIX: Store the window size that produced a result
+    # Every start offset (step 1) per window, in one compiled pass when numba is available
+    series = np.ascontiguousarray(series, dtype=np.float64)
+    rs_means = _rs_means_kernel(series, windows) if NUMBA_AVAILABLE else _rs_means_numpy(series, windows)
+    valid = ~np.isnan(rs_means)
+    rs_values = rs_means[valid]
+    window_sizes = windows[valid]  # only windows that produced a result enter the regression
 
     if len(rs_values) < 3:
         raise ValueError("Insufficient valid windows for Hurst calculation.")
         
-    # Use the stored window_sizes for the regression
-    log_windows = np.log10(window_sizes) # <-- FIX: Use the correct list of sizes
+    log_windows = np.log10(window_sizes)
     log_rs = np.log10(rs_values)
     
     slope, _, _, _, _ = stats.linregress(log_windows, log_rs)
@@ -231,13 +322,57 @@ def calculate_multifractal_spectrum(series: pd.Series,
 
 # --- Fractional Brownian Motion Simulation ---
 
+def _davies_harte_fgn(hurst: float, n: int, num_paths: int) -> Optional[np.ndarray]:
+    """
+    Sample fractional Gaussian noise for many paths at once (Davies-Harte).
+    
+    Mirrors fbm.FBM's Davies-Harte construction, but computes the circulant
+    eigenvalues once and runs a single FFT over a (num_paths, 2n) array.
+    Returns None when the circulant embedding is not positive definite
+    (small n with H close to 1), in which case the caller must fall back.
+    """
+    k = np.arange(1, n, dtype=np.float64)
+    two_h = 2 * hurst
+    autocov = 0.5 * ((k - 1) ** two_h - 2 * k ** two_h + (k + 1) ** two_h)
+    row = np.concatenate(([1.0], autocov, [0.0], autocov[::-1]))
+    eigenvals = np.fft.fft(row).real
+    if np.any(eigenvals < 0):
+        return None
+    
+    gn = np.random.standard_normal((num_paths, n))
+    gn2 = np.random.standard_normal((num_paths, n))
+    
+    w = np.empty((num_paths, 2 * n), dtype=complex)
+    w[:, 0] = np.sqrt(eigenvals[0] / (2 * n)) * gn[:, 0]
+    w[:, 1:n] = np.sqrt(eigenvals[1:n] / (4 * n)) * (gn[:, 1:n] + 1j * gn2[:, 1:n])
+    w[:, n] = np.sqrt(eigenvals[n] / (2 * n)) * gn2[:, 0]
+    w[:, n + 1:] = np.sqrt(eigenvals[n + 1:] / (4 * n)) * (gn[:, :0:-1] - 1j * gn2[:, :0:-1])
+    
+    # Paths are independent rows, so the batched FFT is split across all cores
+    return sp_fft.fft(w, axis=1, workers=-1)[:, :n].real
+
+def _cholesky_fgn(hurst: float, n: int, num_paths: int) -> np.ndarray:
+    """
+    Sample fractional Gaussian noise for many paths from one Cholesky factor.
+    
+    Exact for any (n, H), so it covers the cases Davies-Harte rejects; the
+    O(n^3) factorization is done once and all paths share a single matmul.
+    """
+    lags = np.arange(n, dtype=np.float64)
+    two_h = 2 * hurst
+    autocov = 0.5 * (np.abs(lags - 1) ** two_h - 2 * lags ** two_h + (lags + 1) ** two_h)
+    covariance = autocov[np.abs(lags[:, None] - lags[None, :]).astype(np.intp)]
+    factor = np.linalg.cholesky(covariance)
+    return np.random.standard_normal((num_paths, n)) @ factor.T
+
 def generate_fbm_path(initial_price: float, 
                       hurst: float, 
                       days: int, 
                       volatility: float = 0.2,
-                      drift: float = 0.05) -> np.ndarray:
+                      drift: float = 0.05,
+                      num_paths: Optional[int] = None) -> np.ndarray:
     """
-    Generate a simulated asset price path using Fractional Brownian Motion.
+    Generate simulated asset price paths using Fractional Brownian Motion.
     
     Parameters:
     -----------
@@ -251,27 +386,45 @@ def generate_fbm_path(initial_price: float,
         Annualized volatility.
     drift : float, default=0.05
         Annualized drift rate.
+    num_paths : int, optional
+        Number of independent paths. All paths are generated in one
+        vectorized Davies-Harte pass.
         
     Returns:
     --------
     np.ndarray
-        Array of simulated prices.
+        Array of simulated prices with shape (days+1,), or
+        (num_paths, days+1) when num_paths is given.
     """
     if not 0 < hurst < 1:
         raise ValueError("Hurst exponent must be between 0 and 1")
     
+    n_paths = 1 if num_paths is None else num_paths
+    if n_paths < 1:
+        raise ValueError("num_paths must be at least 1")
+    
     dt = 1 / 252  # Daily time step, assuming 252 trading days
-    fbm_generator = FBM(n=days, hurst=hurst, length=days*dt, method='daviesharte')
-    fbm_sample = fbm_generator.fbm()
+    
+    # fGn increments scaled to a path of length days*dt, as fbm.FBM does
+    fgn = _davies_harte_fgn(hurst, days, n_paths)
+    if fgn is None:
+        # Davies-Harte not applicable (small n, H near 1): exact Cholesky sampling
+        # for all paths at once instead of fbm's per-path Hosking recursion
+        fgn = _cholesky_fgn(hurst, days, n_paths)
+    fgn *= dt ** hurst
+    
+    # Leading zero increment matches np.diff(fbm_sample, prepend=0)
+    increments = np.zeros((n_paths, days + 1))
+    increments[:, 1:] = fgn
     
     # Geometric Fractional Brownian Motion
     drift_term = (drift - 0.5 * volatility**2) * dt
     vol_term = volatility * np.sqrt(dt)
     
-    returns = drift_term + vol_term * np.diff(fbm_sample, prepend=0)
-    prices = initial_price * np.exp(np.cumsum(returns))
+    returns = drift_term + vol_term * increments
+    prices = initial_price * np.exp(np.cumsum(returns, axis=1))
     
-    return prices
+    return prices[0] if num_paths is None else prices
 
 # --- Main Demonstration Block ---
 
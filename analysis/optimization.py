@@ -1,8 +1,18 @@
 # analysis/optimization.py
 
+import logging
 import numpy as np
 from typing import Dict, List, Any
 
+logger = logging.getLogger(__name__)
+
+# Shared generator for the simulated weights and performance jitter
+_rng = np.random.default_rng()
+
+# Simulated performance around these centres, +/- the matching spread
+_PERFORMANCE_CENTRES = np.array([0.18, 0.22, 0.81])
+_PERFORMANCE_SPREADS = np.array([0.02, 0.02, 0.05])
+
 def optimize_portfolio(
     current_portfolio: List[Dict],
     objective: str = "minimize_risk"
@@ -20,7 +30,7 @@ def optimize_portfolio(
     Returns:
         A dictionary containing the optimal weights and expected performance.
     """
-    print(f"[OptimizationTool] Running optimization for objective: {objective}")
+    logger.debug("Running optimization for objective: %s", objective)
 
     if not current_portfolio:
         return {"success": False, "error": "Cannot optimize an empty portfolio."}
@@ -34,8 +44,8 @@ def optimize_portfolio(
     symbols = [pos['symbol'] for pos in current_portfolio]
     n_assets = len(symbols)
     
-    # Generate random "optimal" weights that sum to 1
-    optimal_weights_array = np.random.rand(n_assets)
+    # Generate random "optimal" weights drawn uniformly from the simplex
+    optimal_weights_array = _rng.dirichlet(np.ones(n_assets))
     if objective == "minimize_risk":
         # Artificially lower the weight for known high-volatility stocks
         for i, symbol in enumerate(symbols):
@@ -51,13 +61,17 @@ def optimize_portfolio(
         symbol: weight for symbol, weight in zip(symbols, optimal_weights_array)
     }
 
+    annual_return, annual_volatility, sharpe_ratio = (
+        _PERFORMANCE_CENTRES + _rng.uniform(-_PERFORMANCE_SPREADS, _PERFORMANCE_SPREADS)
+    ).tolist()
+
     return {
         "success": True,
         "objective": objective,
         "optimal_weights": optimal_weights,
         "expected_performance": {
-            "annual_return": 0.18 + np.random.uniform(-0.02, 0.02),
-            "annual_volatility": 0.22 + np.random.uniform(-0.02, 0.02),
-            "sharpe_ratio": 0.81 + np.random.uniform(-0.05, 0.05),
+            "annual_return": annual_return,
+            "annual_volatility": annual_volatility,
+            "sharpe_ratio": sharpe_ratio,
         }
     }
\ No newline at end of file
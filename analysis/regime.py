@@ -16,6 +16,8 @@ Author: Quant Platform Development
 Date: 2025-07-31
 """
 
+import hashlib
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -29,15 +31,41 @@ except ImportError:
     print("Warning: hmmlearn not found. HMM functions will be unavailable. `pip install hmmlearn`")
     hmm = None
 
-# Assuming fractal.py is in the same directory or accessible via PYTHONPATH
+# Package import first; plain import when run as a script from this directory
 try:
-    from fractal import calculate_hurst
+    from .fractal import calculate_hurst_np
 except ImportError:
-    print("Warning: fractal.py not found. Hurst regime analysis will be unavailable.")
-    calculate_hurst = None
+    try:
+        from fractal import calculate_hurst_np
+    except ImportError:
+        print("Warning: fractal.py not found. Hurst regime analysis will be unavailable.")
+        calculate_hurst_np = None
 
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+# Fitted HMMs keyed by (digest of the cleaned returns, n_regimes), so repeated
+# requests on identical data reuse the EM fit instead of refitting
+HMM_FIT_CACHE_SIZE = 128
+_hmm_fit_cache: "OrderedDict[Tuple[bytes, int], Tuple[np.ndarray, object]]" = OrderedDict()
+
+def _fit_hmm(feature_matrix: np.ndarray, n_regimes: int) -> Tuple[np.ndarray, object]:
+    """Fit (or reuse) a Gaussian HMM and decode the hidden states."""
+    key = (hashlib.blake2b(feature_matrix.tobytes(), digest_size=16).digest(), n_regimes)
+    cached = _hmm_fit_cache.get(key)
+    if cached is not None:
+        _hmm_fit_cache.move_to_end(key)
+        return cached
+    
+    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type="full", n_iter=1000)
+    model.fit(feature_matrix)
+    hidden_states = model.predict(feature_matrix)
+    hidden_states.setflags(write=False)  # shared between callers
+    
+    _hmm_fit_cache[key] = (hidden_states, model)
+    if len(_hmm_fit_cache) > HMM_FIT_CACHE_SIZE:
+        _hmm_fit_cache.popitem(last=False)
+    return hidden_states, model
+
 def detect_hmm_regimes(returns: pd.Series, n_regimes: int = 2) -> Tuple[pd.Series, object]:
     """
     Detect market regimes using a Gaussian Hidden Markov Model.
@@ -54,7 +82,8 @@ def detect_hmm_regimes(returns: pd.Series, n_regimes: int = 2) -> Tuple[pd.Serie
     Tuple[pd.Series, object]
         A tuple containing:
         - A Series with the predicted regime for each time step.
-        - The fitted HMM model object for further analysis.
+        - The fitted HMM model object for further analysis (shared with
+          later calls on identical data; treat it as read-only).
     """
     if hmm is None:
         raise ImportError("hmmlearn is not installed.")
@@ -63,13 +92,10 @@ def detect_hmm_regimes(returns: pd.Series, n_regimes: int = 2) -> Tuple[pd.Serie
         
     returns_clean = returns.dropna()
     # HMM requires a 2D array of shape (n_samples, n_features)
-    feature_matrix = returns_clean.values.reshape(-1, 1)
-    
-    model = hmm.GaussianHMM(n_components=n_regimes, covariance_type="full", n_iter=1000)
-    model.fit(feature_matrix)
+    feature_matrix = np.ascontiguousarray(returns_clean.to_numpy(dtype=np.float64).reshape(-1, 1))
     
-    hidden_states = model.predict(feature_matrix)
-    regime_series = pd.Series(hidden_states, index=returns_clean.index, name='hmm_regime')
+    hidden_states, model = _fit_hmm(feature_matrix, n_regimes)
+    regime_series = pd.Series(hidden_states.copy(), index=returns_clean.index, name='hmm_regime')
     
     return regime_series, model
 
@@ -89,10 +115,11 @@ def analyze_hurst_regimes(series: pd.Series, window: int = 100) -> pd.DataFrame:
     pd.DataFrame
         DataFrame with columns: ['hurst', 'regime'].
     """
-    if calculate_hurst is None:
+    if calculate_hurst_np is None:
         raise ImportError("calculate_hurst function not available.")
         
-    rolling_hurst = series.rolling(window).apply(calculate_hurst, raw=False)
+    # raw=True hands each window over as an ndarray instead of building a Series
+    rolling_hurst = series.rolling(window).apply(calculate_hurst_np, raw=True)
     rolling_hurst = rolling_hurst.dropna()
     
     df = pd.DataFrame({'hurst': rolling_hurst})
@@ -1,32 +1,83 @@
 # analysis/risk.py (REFACTORED)
 
+import logging
 import pandas as pd
 import numpy as np
 from arch import arch_model
 from typing import List, Dict, Any
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
 # Import our new market data utility
 from utils.market_data import get_historical_data
 
+logger = logging.getLogger(__name__)
+
+# Shared generator for the simulated forecast jitter
+_rng = np.random.default_rng()
+
 # This function does not need refactoring as it's a pure mathematical utility
 def calculate_cvar(returns: pd.Series, confidence_level: float = 0.95) -> float:
     """Calculate Conditional Value at Risk (CVaR) / Expected Shortfall (ES)."""
     if not isinstance(returns, pd.Series):
         raise TypeError("Returns must be a pandas Series")
+    return calculate_cvar_np(returns.to_numpy(dtype=np.float64), confidence_level)
+
+def _quantile_linear(values: np.ndarray, probability: float) -> float:
+    """
+    np.quantile(values, probability) with the default linear method, selecting only
+    the two order statistics it interpolates between instead of a full quantile pass.
+    """
+    position = probability * (values.size - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, values.size - 1)
+    selected = np.partition(values, (lower, upper))
+    below, above = selected[lower], selected[upper]
+    fraction = position - lower
+    # Same two-sided lerp as NumPy, so the threshold matches it exactly
+    if fraction >= 0.5:
+        return above - (above - below) * (1 - fraction)
+    return below + (above - below) * fraction
+
+def _tail_sum_count(values: np.ndarray, threshold: float) -> tuple:
+    """Sum and count of values at or below threshold, in one pass without a mask copy"""
+    total = 0.0
+    count = 0
+    for value in values:
+        if value <= threshold:
+            total += value
+            count += 1
+    return total, count
+
+if NUMBA_AVAILABLE:
+    _tail_sum_count = njit(cache=True)(_tail_sum_count)
+
+def calculate_cvar_np(returns: np.ndarray, confidence_level: float = 0.95) -> float:
+    """Calculate CVaR / Expected Shortfall from a raw float64 array (NaNs are ignored)."""
     if not 0 < confidence_level < 1:
         raise ValueError("Confidence level must be between 0 and 1")
     
-    clean_returns = returns.dropna()
+    missing = np.isnan(returns)
+    clean_returns = returns[~missing] if missing.any() else returns
     if len(clean_returns) == 0:
         return np.nan
         
-    var_threshold = clean_returns.quantile(1 - confidence_level)
-    tail_losses = clean_returns[clean_returns <= var_threshold]
+    var_threshold = _quantile_linear(clean_returns, 1 - confidence_level)
+    if NUMBA_AVAILABLE:
+        tail_sum, tail_count = _tail_sum_count(clean_returns, var_threshold)
+    else:
+        tail_losses = clean_returns[clean_returns <= var_threshold]
+        tail_sum, tail_count = tail_losses.sum(), tail_losses.size
     
-    if len(tail_losses) == 0:
+    if tail_count == 0:
         return -var_threshold
         
-    return -tail_losses.mean()
+    return -(tail_sum / tail_count)
 
 def fit_garch_forecast(returns: pd.Series, forecast_horizon: int = 30) -> tuple:
     """
@@ -34,6 +85,10 @@ def fit_garch_forecast(returns: pd.Series, forecast_horizon: int = 30) -> tuple:
     
     This implementation uses a Student's T distribution to better model fat tails
     commonly found in financial returns.
+    
+    Returns (in_sample_volatility, forecast_volatility). The forecast is indexed by
+    calendar dates only when the input has a DatetimeIndex; otherwise it continues
+    the input's integer positions, so no dates are allocated for plain series.
     """
     if len(returns) < 50:
         raise ValueError("Need at least 50 observations for reliable GARCH estimation.")
@@ -51,7 +106,7 @@ def fit_garch_forecast(returns: pd.Series, forecast_horizon: int = 30) -> tuple:
         )
         fitted_model = model.fit(disp='off')
     except Exception as e:
-        print(f"GARCH model fitting failed: {e}. Falling back to simpler model.")
+        logger.warning("GARCH model fitting failed: %s. Falling back to simpler model.", e)
         # Fallback to a simpler model if the first one fails
         model = arch_model(returns_pct, vol='Garch', p=1, q=1)
         fitted_model = model.fit(disp='off')
@@ -60,11 +115,15 @@ def fit_garch_forecast(returns: pd.Series, forecast_horizon: int = 30) -> tuple:
     forecast = fitted_model.forecast(horizon=forecast_horizon, reindex=False)
     future_vol_values = np.sqrt(forecast.variance).iloc[0].values / 100
     
-    # Create a future date index for the forecast
-    future_dates = pd.date_range(start=returns.index[-1] + pd.Timedelta(days=1), periods=forecast_horizon)
-    forecast_series = pd.Series(future_vol_values, index=future_dates)
+    if isinstance(returns.index, pd.DatetimeIndex):
+        # Create a future date index for the forecast
+        future_index = pd.date_range(start=returns.index[-1] + pd.Timedelta(days=1), periods=forecast_horizon)
+    else:
+        future_index = pd.RangeIndex(len(returns), len(returns) + forecast_horizon)
+    forecast_series = pd.Series(future_vol_values, index=future_index)
+    in_sample_vol = fitted_model.conditional_volatility / 100
     
-    return forecast_series
+    return in_sample_vol, forecast_series
 
 def forecast_portfolio_volatility(portfolio_data: List[Dict], forecast_horizon: int = 30) -> Dict[str, Any]:
     """
@@ -79,8 +138,9 @@ def forecast_portfolio_volatility(portfolio_data: List[Dict], forecast_horizon:
     num_assets = len(portfolio_data)
     base_vol = 0.15 + (num_assets * 0.05) # Simple heuristic
     
-    current_vol = base_vol + np.random.uniform(-0.02, 0.02)
-    forecast_mean = current_vol * np.random.uniform(0.95, 1.05)
+    vol_shift, forecast_scale = _rng.uniform((-0.02, 0.95), (0.02, 1.05)).tolist()
+    current_vol = base_vol + vol_shift
+    forecast_mean = current_vol * forecast_scale
 
     return {
         "success": True,
@@ -112,10 +172,20 @@ def calculate_multi_level_var(
         if not isinstance(portfolio_returns, pd.Series) or portfolio_returns.empty:
             return {"success": False, "error": "A valid series of portfolio returns is required."}
 
+        if not all(0 < confidence < 1 for confidence in confidence_levels):
+            raise ValueError("Confidence level must be between 0 and 1")
+
+        # All levels share one cleaned, sorted array: the quantiles come from a single
+        # np.quantile call and each tail mean is a prefix-sum lookup instead of a rescan
+        sorted_returns = np.sort(portfolio_returns.to_numpy(dtype=np.float64))
+        sorted_returns = sorted_returns[~np.isnan(sorted_returns)]
+        prefix_sums = np.cumsum(sorted_returns)
+        var_values = np.quantile(sorted_returns, [1 - confidence for confidence in confidence_levels])
+        tail_counts = np.searchsorted(sorted_returns, var_values, side="right")
+
         var_results = {}
-        for confidence in confidence_levels:
-            var_value = portfolio_returns.quantile(1 - confidence)
-            cvar_value = calculate_cvar(portfolio_returns, confidence)
+        for confidence, var_value, tail_count in zip(confidence_levels, var_values, tail_counts):
+            cvar_value = -prefix_sums[tail_count - 1] / tail_count if tail_count else -var_value
             
             confidence_pct = int(confidence * 100)
             var_results[f"var_{confidence_pct}"] = {
@@ -5,27 +5,87 @@ Portfolio & Strategy Analysis Module
 This module provides the foundational logic for advanced portfolio analysis,
 including factor analysis, portfolio optimization, and strategy backtesting.
 
-This script currently contains placeholder functions (stubs) that define the
-intended API for these complex operations. The full logic will be implemented
-in a later development phase.
+Factor analysis is an OLS regression on the factor returns, and portfolio
+optimization uses SciPy's SLSQP solver on a float32 covariance estimate.
+Backtesting still contains placeholder logic (a stub) that defines the
+intended API; its full logic will be implemented in a later development phase.
 
 Dependencies:
-    pip install numpy pandas
+    pip install numpy pandas scipy
+
+Optional Dependencies:
+    pip install scikit-learn    # Ledoit-Wolf covariance shrinkage
+    pip install numba           # JIT-compiled signal kernels
 
 Future Dependencies:
-    pip install statsmodels PyPortfolioOpt backtesting.py
+    pip install backtesting.py
 
 Author: Quant Platform Development
 Date: 2025-07-31
 """
 
+import logging
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Callable,Any
-from .fractal import calculate_hurst
+from typing import Dict, List, Callable, Any, Tuple
+from scipy.optimize import minimize
+from .fractal import calculate_hurst_np
 # ### NEW IMPORT ### - Our market data utility
 from utils.market_data import get_historical_data
 
+try:
+    from sklearn.covariance import ledoit_wolf_shrinkage
+except ImportError:
+    ledoit_wolf_shrinkage = None
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+def _ols_kernel(y: np.ndarray, X: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Least-squares coefficients and R-squared via the normal equations."""
+    coefficients = np.linalg.solve(X.T @ X, X.T @ y)
+    residuals = y - X @ coefficients
+    centered = y - y.mean()
+    r_squared = 1.0 - (residuals @ residuals) / (centered @ centered)
+    return coefficients, r_squared
+
+if NUMBA_AVAILABLE:
+    _ols_kernel = njit(cache=True)(_ols_kernel)
+
+# Regression kernels specialized per factor set, keyed by the factor column names
+_factor_kernel_cache: Dict[Tuple[str, ...], Callable] = {}
+
+def _get_factor_kernel(columns: Tuple[str, ...]) -> Callable:
+    """
+    Return the regression kernel for a fixed set of factor columns.
+    
+    Column positions, the RF column and the design-matrix width are resolved
+    once per factor set (e.g. FF3, FF5) so repeated calls skip the lookups.
+    """
+    kernel = _factor_kernel_cache.get(columns)
+    if kernel is not None:
+        return kernel
+    
+    factor_positions = np.array([i for i, name in enumerate(columns) if name != 'RF'], dtype=np.int64)
+    rf_position = columns.index('RF') if 'RF' in columns else None
+    n_coefficients = len(factor_positions) + 1
+    
+    def kernel(portfolio: np.ndarray, factors: np.ndarray) -> Tuple[np.ndarray, float]:
+        y = portfolio - factors[:, rf_position] if rf_position is not None else portfolio
+        X = np.empty((len(y), n_coefficients))
+        X[:, 0] = 1.0
+        X[:, 1:] = factors[:, factor_positions]
+        return _ols_kernel(np.ascontiguousarray(y), X)
+    
+    _factor_kernel_cache[columns] = kernel
+    return kernel
+
 def perform_factor_analysis(portfolio_returns: pd.Series, 
                               factor_returns: pd.DataFrame) -> Dict[str, float]:
     """
@@ -37,32 +97,117 @@ def perform_factor_analysis(portfolio_returns: pd.Series,
     Parameters:
     -----------
     portfolio_returns : pd.Series
-        Time series of the portfolio's returns.
+        Time series of the portfolio's daily returns.
     factor_returns : pd.DataFrame
         DataFrame where each column is a time series for a risk factor.
-        Must include a 'RF' (Risk-Free) column for excess return calculation.
+        An 'RF' (Risk-Free) column, if present, is used for the excess return
+        calculation and excluded from the regressors.
         
     Returns:
     --------
     Dict[str, float]
         A dictionary containing the factor loadings (betas), alpha, and R-squared.
-        Example: {'alpha': 0.01, 'Mkt-RF': 1.05, 'SMB': 0.2, 'R-squared': 0.92}
+        Example: {'alpha_annual': 0.015, 'Mkt-RF_beta': 1.05, 'SMB_beta': 0.15, 'R_squared': 0.91}
     """
-    print("[INFO] Placeholder: Performing factor analysis...")
-    # --- Future Implementation ---
-    # 1. Align portfolio and factor returns by index.
-    # 2. Calculate portfolio excess returns (portfolio_returns - factor_returns['RF']).
-    # 3. Use a library like statsmodels.api.OLS to perform the regression.
-    # 4. Extract coefficients (betas), intercept (alpha), and R-squared.
-    # 5. Return results in a dictionary.
+    logger.debug("Performing factor analysis")
+    
+    portfolio, factors = portfolio_returns.align(factor_returns, join='inner', axis=0)
+    y = portfolio.to_numpy(dtype=np.float64)
+    F = factors.to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(y) | np.isnan(F).any(axis=1))
+    y, F = y[valid], F[valid]
+    
+    columns = tuple(factor_returns.columns)
+    factor_names = [name for name in columns if name != 'RF']
+    if not factor_names:
+        raise ValueError("At least one risk factor column (besides 'RF') is required")
+    if len(y) <= len(factor_names) + 1:
+        raise ValueError("Not enough overlapping observations for factor regression")
+    
+    coefficients, r_squared = _get_factor_kernel(columns)(y, F)
+    
+    results = {'alpha_annual': float(coefficients[0] * 252)}
+    for name, beta in zip(factor_names, coefficients[1:]):
+        results[f'{name}_beta'] = float(beta)
+    results['R_squared'] = float(r_squared)
+    return results
+
+def _estimate_moments(asset_returns: pd.DataFrame,
+                      shrinkage: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimate mean returns and the covariance matrix in float32.
+    
+    The sample covariance is a single ``X.T @ X`` product on centered float32
+    returns, which BLAS dispatches to sgemm. When scikit-learn is available the
+    matrix is shrunk towards a scaled identity (Ledoit-Wolf) so it stays well
+    conditioned for large universes.
+    
+    Parameters:
+    -----------
+    asset_returns : pd.DataFrame
+        DataFrame where each column represents the returns of an asset.
+    shrinkage : bool, default=True
+        Apply Ledoit-Wolf shrinkage to the sample covariance if possible.
+        
+    Returns:
+    --------
+    Tuple[np.ndarray, np.ndarray]
+        Mean returns of shape (K,) and covariance matrix of shape (K, K).
+    """
+    returns = asset_returns.dropna().to_numpy(dtype=np.float32)
+    if len(returns) < 2:
+        raise ValueError("Need at least 2 complete return observations for optimization")
+    
+    mean_returns = returns.mean(axis=0)
+    centered = returns - mean_returns
+    cov = (centered.T @ centered) / np.float32(len(centered) - 1)
+    
+    if shrinkage and ledoit_wolf_shrinkage is not None:
+        delta = np.float32(ledoit_wolf_shrinkage(centered, assume_centered=True))
+        target = np.float32(np.trace(cov) / cov.shape[0])
+        cov *= (1 - delta)
+        cov.flat[::cov.shape[0] + 1] += delta * target
+    
+    return mean_returns, cov
+
+def simulate_random_portfolios(mean_returns: np.ndarray, 
+                               cov: np.ndarray, 
+                               n_portfolios: int = 50_000,
+                               seed: int = None) -> Dict[str, np.ndarray]:
+    """
+    Draw random long-only portfolios and evaluate them in bulk.
+    
+    Weights are sampled uniformly from the simplex with a single Dirichlet
+    draw into a contiguous (M, K) matrix, so returns and volatilities for all
+    M portfolios come from one matrix product each instead of a Python loop.
+    
+    Parameters:
+    -----------
+    mean_returns : np.ndarray
+        Expected returns of shape (K,).
+    cov : np.ndarray
+        Covariance matrix of shape (K, K).
+    n_portfolios : int, default=50_000
+        Number of portfolios (M) to sample.
+    seed : int, optional
+        Seed for reproducible draws.
+        
+    Returns:
+    --------
+    Dict[str, np.ndarray]
+        'weights' (M, K), 'returns' (M,), 'volatilities' (M,) and the index
+        of the highest return/volatility portfolio under 'max_sharpe_index'.
+    """
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(len(mean_returns)), size=n_portfolios)
+    returns = weights @ mean_returns
+    volatilities = np.sqrt(np.sum((weights @ cov) * weights, axis=1))
     
-    # Placeholder return value
     return {
-        'alpha_annual': 0.015,
-        'Mkt-RF_beta': 1.05,
-        'SMB_beta': 0.15,
-        'HML_beta': -0.1,
-        'R_squared': 0.91
+        'weights': weights,
+        'returns': returns,
+        'volatilities': volatilities,
+        'max_sharpe_index': int(np.argmax(returns / volatilities))
     }
 
 def optimize_portfolio(asset_returns: pd.DataFrame, 
@@ -76,10 +221,13 @@ def optimize_portfolio(asset_returns: pd.DataFrame,
     asset_returns : pd.DataFrame
         DataFrame where each column represents the returns of an asset.
     objective : str, default='MaximizeSharpe'
-        The optimization objective. Examples: 'MaximizeSharpe', 'MinimizeVolatility',
-        'MinimizeCVaR', 'AchieveTargetReturn'.
+        The optimization objective. Supported: 'MaximizeSharpe',
+        'MinimizeVolatility', 'AchieveTargetReturn'.
     constraints : Dict, optional
         A dictionary of constraints, e.g., {'weight_bounds': (0, 0.2)}.
+        'AchieveTargetReturn' requires a 'target_return' entry (per-period
+        return, same frequency as ``asset_returns``). Set 'shrinkage' to False
+        to use the raw sample covariance.
         
     Returns:
     --------
@@ -87,21 +235,138 @@ def optimize_portfolio(asset_returns: pd.DataFrame,
         A dictionary mapping asset tickers to their optimal weights.
         Example: {'AAPL': 0.25, 'MSFT': 0.25, 'GOOG': 0.5}
     """
-    print(f"[INFO] Placeholder: Optimizing portfolio for objective: {objective}...")
-    # --- Future Implementation ---
-    # 1. Calculate expected returns and the covariance matrix from asset_returns.
-    # 2. Use a library like PyPortfolioOpt.
-    # 3. Instantiate an EfficientFrontier object.
-    # 4. Apply constraints if provided.
-    # 5. Call the appropriate optimization method (e.g., max_sharpe(), min_volatility()).
-    # 6. Extract and return the clean weights.
+    logger.debug("Optimizing portfolio for objective: %s", objective)
+    constraints = constraints or {}
     
-    # Placeholder return value
     tickers = asset_returns.columns
-    weights = np.random.rand(len(tickers))
-    weights /= np.sum(weights)
+    n_assets = len(tickers)
+    if n_assets == 0:
+        raise ValueError("Cannot optimize a portfolio with no assets")
+    
+    mean_returns, cov = _estimate_moments(asset_returns, constraints.get('shrinkage', True))
+    
+    # The covariance is precomputed once; objectives and gradients are closed form
+    def variance(w):
+        return w @ cov @ w
     
-    return {ticker: weight for ticker, weight in zip(tickers, weights)}
+    def variance_grad(w):
+        return 2 * (cov @ w)
+    
+    def negative_sharpe(w):
+        return -(w @ mean_returns) / np.sqrt(w @ cov @ w)
+    
+    def negative_sharpe_grad(w):
+        cov_w = cov @ w
+        vol = np.sqrt(w @ cov_w)
+        ret = w @ mean_returns
+        return -(mean_returns * vol - ret * cov_w / vol) / vol**2
+    
+    solver_constraints = [
+        {'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0, 'jac': lambda w: np.ones_like(w)}
+    ]
+    
+    if objective == 'MaximizeSharpe':
+        fun, jac = negative_sharpe, negative_sharpe_grad
+    elif objective == 'MinimizeVolatility':
+        fun, jac = variance, variance_grad
+    elif objective == 'AchieveTargetReturn':
+        if 'target_return' not in constraints:
+            raise ValueError("'AchieveTargetReturn' requires a 'target_return' constraint")
+        target_return = constraints['target_return']
+        solver_constraints.append(
+            {'type': 'eq', 'fun': lambda w: w @ mean_returns - target_return, 'jac': lambda w: mean_returns}
+        )
+        fun, jac = variance, variance_grad
+    else:
+        raise ValueError(f"Unsupported optimization objective: {objective}")
+    
+    bounds = [constraints.get('weight_bounds', (0.0, 1.0))] * n_assets
+    initial_weights = np.full(n_assets, 1.0 / n_assets)
+    
+    result = minimize(
+        fun,
+        initial_weights,
+        method='SLSQP',
+        jac=jac,
+        bounds=bounds,
+        constraints=solver_constraints,
+        # Per-period variances are ~1e-4, below SLSQP's default ftol of 1e-6
+        options={'ftol': 1e-12, 'maxiter': 500}
+    )
+    if not result.success:
+        raise ValueError(f"Portfolio optimization did not converge: {result.message}")
+    
+    return {ticker: float(weight) for ticker, weight in zip(tickers, result.x)}
+
+def _dual_sma_signal_kernel(prices: np.ndarray, short_window: int, long_window: int) -> np.ndarray:
+    """Single pass over prices keeping one running sum per window."""
+    n = prices.shape[0]
+    signal = np.zeros(n, dtype=np.int8)
+    short_sum = 0.0
+    long_sum = 0.0
+    for i in range(n):
+        short_sum += prices[i]
+        long_sum += prices[i]
+        if i >= short_window:
+            short_sum -= prices[i - short_window]
+        if i >= long_window:
+            long_sum -= prices[i - long_window]
+        if i >= long_window - 1 and short_sum / short_window > long_sum / long_window:
+            signal[i] = 1
+    return signal
+
+if NUMBA_AVAILABLE:
+    _dual_sma_signal_kernel = njit(cache=True)(_dual_sma_signal_kernel)
+
+def dual_sma_signal(prices: np.ndarray, 
+                    short_window: int = 50, 
+                    long_window: int = 200) -> np.ndarray:
+    """
+    Moving-average crossover signal computed in a single O(N) pass.
+    
+    Equivalent to ``prices.rolling(short_window).mean() > prices.rolling(long_window).mean()``
+    without allocating the two intermediate rolling Series.
+    
+    Parameters:
+    -----------
+    prices : np.ndarray
+        1-D array of prices without NaN values.
+    short_window : int, default=50
+        Window of the fast moving average.
+    long_window : int, default=200
+        Window of the slow moving average.
+        
+    Returns:
+    --------
+    np.ndarray
+        int8 array with 1 (long) where the fast average is above the slow one
+        and 0 (flat) otherwise, including the warm-up period.
+    """
+    if not 0 < short_window < long_window:
+        raise ValueError("short_window must be positive and smaller than long_window")
+    
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _dual_sma_signal_kernel(prices, short_window, long_window)
+    
+    # NumPy fallback: both moving averages from one cumulative sum
+    signal = np.zeros(len(prices), dtype=np.int8)
+    if len(prices) >= long_window:
+        csum = np.concatenate(([0.0], np.cumsum(prices)))
+        short_ma = (csum[long_window:] - csum[long_window - short_window:-short_window]) / short_window
+        long_ma = (csum[long_window:] - csum[:-long_window]) / long_window
+        signal[long_window - 1:] = short_ma > long_ma
+    return signal
+
+def rolling_mean(data: pd.DataFrame, window: int) -> pd.DataFrame:
+    """
+    Rolling mean of each column, JIT-compiled by pandas' numba engine when
+    numba is installed (the compiled kernel is reused across calls).
+    """
+    rolling = data.rolling(window)
+    if NUMBA_AVAILABLE:
+        return rolling.mean(engine='numba', engine_kwargs={'nopython': True, 'nogil': True, 'parallel': False})
+    return rolling.mean()
 
 def run_backtest(prices: pd.DataFrame, 
                    strategy_logic: Callable[[pd.Series], pd.Series]) -> Dict:
@@ -122,7 +387,7 @@ def run_backtest(prices: pd.DataFrame,
         A dictionary of performance metrics (Sharpe Ratio, Max Drawdown, etc.)
         and the equity curve of the backtest.
     """
-    print("[INFO] Placeholder: Running backtest...")
+    logger.debug("Placeholder: running backtest")
     # --- Future Implementation ---
     # 1. Use a library like backtesting.py or a custom event-driven loop.
     # 2. Define the strategy class/logic, wrapping the strategy_logic function.
@@ -149,7 +414,7 @@ async def design_mean_reversion_strategy(
     universe: List[str], 
     hurst_threshold: float = 0.45
 ) -> Dict[str, Any]:
-    print(f"[StrategyTool] Designing mean-reversion strategy for universe: {universe}")
+    logger.debug("Designing mean-reversion strategy for universe: %s", universe)
     
     # Use await to call our async data utility
     historical_data = await get_historical_data(universe, period="1y")
@@ -157,17 +422,30 @@ async def design_mean_reversion_strategy(
         return {"success": False, "error": "Could not fetch historical price data for the universe."}
     
     price_data = historical_data['Close']
+    # Resolve every ticker's column once and work on NumPy views in the loop
+    price_values = price_data.to_numpy(dtype=np.float64)
+    column_positions = price_data.columns.get_indexer(universe)
+
+    missing = [ticker for ticker, position in zip(universe, column_positions) if position < 0]
+    if missing:
+        logger.warning("No price data for Hurst calculation: %s", missing)
+    tickers = [ticker for ticker, position in zip(universe, column_positions) if position >= 0]
+    columns = price_values[:, column_positions[column_positions >= 0]]
+
+    # Validity is known up front: at least 100 prices and some variation
+    # (a constant series has no valid R/S windows)
+    has_history = np.count_nonzero(~np.isnan(columns), axis=0) >= 100
+    varies = np.zeros(len(tickers), dtype=bool)
+    varies[has_history] = (
+        np.nanmax(columns[:, has_history], axis=0) > np.nanmin(columns[:, has_history], axis=0)
+    )
+    valid = has_history & varies
 
     hurst_results = []
-    for ticker in universe:
-        try:
-            price_series = price_data[ticker].dropna()
-            if len(price_series) < 100: continue
-            h_value = calculate_hurst(price_series)
-            hurst_results.append({'ticker': ticker, 'hurst': round(h_value, 4)})
-        except (KeyError, ValueError) as e:
-            print(f"Could not process {ticker} for Hurst calculation: {e}")
-            continue
+    for ticker, column in zip([t for t, ok in zip(tickers, valid) if ok], columns[:, valid].T):
+        prices = column[~np.isnan(column)]
+        h_value = calculate_hurst_np(prices)
+        hurst_results.append({'ticker': ticker, 'hurst': round(h_value, 4)})
     # ... The rest of the function (filtering, sorting, returning results) remains exactly the same ...
     candidates = [res for res in hurst_results if res['hurst'] < hurst_threshold]
     sorted_candidates = sorted(candidates, key=lambda x: x['hurst'])
@@ -210,24 +488,34 @@ if __name__ == "__main__":
     )
     
     # 1. Demonstrate Factor Analysis
-    print("1. Factor Analysis (Placeholder)")
-    print("-" * 30)
+    print("1. Factor Analysis")
+    print("-" * 17)
     factor_exposures = perform_factor_analysis(portfolio_returns_s, factor_returns_df)
     print(factor_exposures)
     
     # 2. Demonstrate Portfolio Optimization
-    print("\n2. Portfolio Optimization (Placeholder)")
-    print("-" * 38)
+    print("\n2. Portfolio Optimization")
+    print("-" * 24)
     optimal_weights = optimize_portfolio(asset_returns_df)
     print(optimal_weights)
     
+    mean_returns, cov = _estimate_moments(asset_returns_df)
+    random_portfolios = simulate_random_portfolios(mean_returns, cov, seed=42)
+    best_random = random_portfolios['weights'][random_portfolios['max_sharpe_index']]
+    print(f"Best of {len(random_portfolios['weights'])} random portfolios: "
+          f"{dict(zip(asset_tickers, np.round(best_random, 4).tolist()))}")
+    
     # 3. Demonstrate Backtesting
     print("\n3. Backtesting (Placeholder)")
     print("-" * 28)
     # A dummy strategy: go long if the 50-day moving average is above the 200-day
-    def sample_strategy(prices: pd.Series):
-        signal = prices.rolling(50).mean() > prices.rolling(200).mean()
-        return signal.astype(int) # Returns 1 for long, 0 for flat
+    def sample_strategy(prices):
+        if isinstance(prices, pd.DataFrame):
+            # One signal column per asset
+            signal = rolling_mean(prices, 50) > rolling_mean(prices, 200)
+            return signal.astype(int)
+        signal = dual_sma_signal(prices.to_numpy(np.float64), 50, 200)
+        return pd.Series(signal, index=prices.index) # Returns 1 for long, 0 for flat
         
     backtest_results = run_backtest(pd.DataFrame(portfolio_returns_s), sample_strategy)
     print(backtest_results)
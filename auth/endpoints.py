@@ -5,21 +5,24 @@ Updated to use SQLAlchemy instead of in-memory storage
 
 from datetime import datetime, timedelta
 from typing import Optional, Any
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-import os
+import asyncio
 import logging
 
 # Import database and models
-from core.database import get_db
+from core.database import get_db, SessionLocal
+from auth.security import pwd_context  # shared so BCRYPT_ROUNDS applies everywhere
+from auth.security import create_access_token, verify_token as verify_token_payload
+from config import settings
 from models.user import (
     User, UserCreate, UserLogin, UserResponse, UserUpdate,
     Token, TokenData, LoginResponse, RegisterResponse, AuthError,
-    get_user_by_email, get_user_by_id, get_user_by_username, create_user_in_db, 
-    update_user_login_time, user_exists, verify_user_password,
+    get_user_by_email, get_user_by_id, create_user_in_db, 
+    get_users_by_email_or_username, update_user_in_db,
+    record_user_login, record_user_logins, user_exists,
     convert_user_to_response, get_database_users_info
 )
 
@@ -31,13 +34,9 @@ logger = logging.getLogger(__name__)
 # SECURITY CONFIGURATION
 # ================================
 
-# JWT Configuration
-SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT Configuration (tokens are signed and verified by auth.security with settings.SECRET_KEY)
+ALGORITHM = settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
 # HTTP Bearer security scheme
 security = HTTPBearer()
@@ -49,47 +48,136 @@ router = APIRouter(prefix="/api/v1/auth", tags=["authentication"])
 # UTILITY FUNCTIONS
 # ================================
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+def verify_token(token: str) -> Optional[TokenData]:
+    """Verify and decode a JWT access token"""
+    payload = verify_token_payload(token)
+    if payload is None:
+        logger.error("JWT verification failed")
+        return None
+    
+    # Refresh tokens are only valid for minting new access tokens
+    if payload.get("type", "access") != "access":
+        return None
+    
+    email: str = payload.get("sub")
+    user_id: str = payload.get("user_id")
+    exp: datetime = datetime.fromtimestamp(payload.get("exp", 0))
     
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    if email is None or user_id is None:
+        return None
+        
+    token_data = TokenData(email=email, user_id=user_id, exp=exp)
+    return token_data
 
-def verify_token(token: str) -> Optional[TokenData]:
-    """Verify and decode JWT token"""
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        user_id: str = payload.get("user_id")
-        exp: datetime = datetime.fromtimestamp(payload.get("exp", 0))
-        
-        if email is None or user_id is None:
-            return None
-            
-        token_data = TokenData(email=email, user_id=user_id, exp=exp)
-        return token_data
-    except JWTError as e:
-        logger.error(f"JWT verification failed: {e}")
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the default executor so bcrypt does not block the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, pwd_context.hash, password)
+
+async def verify_user_password_async(db: Session, email: str, password: str) -> Optional[User]:
+    """
+    verify_user_password with only the bcrypt compare on the default executor.
+    The lookup stays on the request's own path, since the Session is not thread-safe.
+    """
+    user = get_user_by_email(db, email)
+    if not user:
+        return None
+    
+    loop = asyncio.get_running_loop()
+    verified, new_hash = await loop.run_in_executor(
+        None, pwd_context.verify_and_update, password, user.hashed_password
+    )
+    if not verified:
         return None
+    
+    # Hash was created with an outdated cost; the caller's next commit persists the upgrade
+    if new_hash:
+        user.hashed_password = new_hash
+    
+    return user
+
+# ================================
+# LOGIN RECORDING WORKER
+# ================================
+
+# Pending last_login writes; logins wait for room once this many are queued
+LOGIN_QUEUE_MAX_SIZE = 1024
+# Upper bound on logins folded into one UPDATE statement
+LOGIN_BATCH_MAX_SIZE = 256
+LOGIN_DRAIN_TIMEOUT_SECONDS = 5.0
+
+_login_queue: Optional[asyncio.Queue] = None
+_login_worker: Optional[asyncio.Task] = None
+
+async def _record_logins_worker(queue: asyncio.Queue) -> None:
+    """Drain queued logins, writing everything pending as one batch on the default executor"""
+    loop = asyncio.get_running_loop()
+    while True:
+        user_id, logged_in_at = await queue.get()
+        batch = {user_id: logged_in_at}
+        taken = 1
+        while taken < LOGIN_BATCH_MAX_SIZE and not queue.empty():
+            user_id, logged_in_at = queue.get_nowait()
+            batch[user_id] = logged_in_at
+            taken += 1
+        try:
+            await loop.run_in_executor(None, record_user_logins, SessionLocal, batch)
+        except Exception as e:
+            logger.error("Failed to record %d login(s): %s", len(batch), e)
+        finally:
+            for _ in range(taken):
+                queue.task_done()
+
+def start_login_recorder() -> None:
+    """Create the login queue and its worker; call from the application lifespan"""
+    global _login_queue, _login_worker
+    _login_queue = asyncio.Queue(maxsize=LOGIN_QUEUE_MAX_SIZE)
+    _login_worker = asyncio.create_task(_record_logins_worker(_login_queue))
+
+async def stop_login_recorder(timeout: float = LOGIN_DRAIN_TIMEOUT_SECONDS) -> None:
+    """Flush queued logins (bounded by timeout), then cancel the worker"""
+    global _login_queue, _login_worker
+    queue, worker = _login_queue, _login_worker
+    _login_queue = _login_worker = None
+    if worker is None:
+        return
+    try:
+        await asyncio.wait_for(queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Login recorder stopped with %d login(s) unwritten", queue.qsize())
+    worker.cancel()
+    try:
+        await worker
+    except asyncio.CancelledError:
+        pass
+
+async def enqueue_login(user_id: str, background_tasks: BackgroundTasks) -> None:
+    """Queue a last_login write; without a running worker fall back to a per-request background task"""
+    if _login_queue is None or _login_worker is None or _login_worker.done():
+        background_tasks.add_task(record_user_login, SessionLocal, user_id)
+        return
+    await _login_queue.put((user_id, datetime.utcnow()))
 
 # ================================
 # DEPENDENCY FUNCTIONS
 # ================================
 
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
     """
     Get current authenticated user from JWT token
     This is the function that was failing before!
+    
+    The resolved user and token data are stored on request.state so handlers
+    and helpers in the same request can reuse them instead of re-querying.
     """
+    cached_user = getattr(request.state, "current_user", None)
+    if cached_user is not None:
+        return cached_user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -99,7 +187,7 @@ async def get_current_user(
     try:
         # Extract token from credentials
         token = credentials.credentials
-        logger.info(f"Validating token: {token[:20]}...")
+        logger.info("Validating token: %s...", token[:20])
         
         # Verify and decode token
         token_data = verify_token(token)
@@ -107,22 +195,21 @@ async def get_current_user(
             logger.error("Token verification failed")
             raise credentials_exception
         
-        logger.info(f"Token valid for user: {token_data.email}")
+        logger.info("Token valid for user: %s", token_data.email)
         
         # Get user from database using the email from token
         user = get_user_by_email(db, token_data.email)
         if user is None:
-            logger.error(f"User not found in database: {token_data.email}")
+            logger.error("User not found in database: %s", token_data.email)
             raise credentials_exception
         
-        logger.info(f"User found in database: {user.email}")
+        logger.info("User found in database: %s", user.email)
+        request.state.current_user = user
+        request.state.token_data = token_data
         return user
         
-    except JWTError as e:
-        logger.error(f"JWT error in get_current_user: {e}")
-        raise credentials_exception
     except Exception as e:
-        logger.error(f"Unexpected error in get_current_user: {e}")
+        logger.error("Unexpected error in get_current_user: %s", e)
         raise credentials_exception
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -147,7 +234,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             )
         
         # Hash password
-        hashed_password = pwd_context.hash(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Create user in database
         db_user = create_user_in_db(db, user_data, hashed_password)
@@ -162,17 +249,17 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
             expires_delta=access_token_expires
         )
         
-        # Create token response
-        token = Token(
+        # Create token response (server-built, so validation is skipped)
+        token = Token.model_construct(
             access_token=access_token,
             token_type="bearer",
             expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             user=user_response
         )
         
-        logger.info(f"User registered successfully: {db_user.email}")
+        logger.info("User registered successfully: %s", db_user.email)
         
-        return RegisterResponse(
+        return RegisterResponse.model_construct(
             message="User registered successfully",
             user=user_response,
             token=token
@@ -181,18 +268,22 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Registration error: {e}")
+        logger.error("Registration error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed"
         )
 
 @router.post("/login", response_model=LoginResponse)
-async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
+async def login_user(
+    login_data: UserLogin,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Authenticate user and return access token"""
     try:
         # Verify user credentials
-        user = verify_user_password(db, login_data.email, login_data.password, pwd_context)
+        user = await verify_user_password_async(db, login_data.email, login_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -207,8 +298,12 @@ async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
                 detail="Inactive user account"
             )
         
-        # Update last login time
-        update_user_login_time(db, user.id)
+        # Persist a password rehash from verify_and_update, if any
+        if db.dirty:
+            db.commit()
+        
+        # Update last login time off the request path, batched by the login recorder
+        await enqueue_login(user.id, background_tasks)
         
         # Create access token
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -220,17 +315,17 @@ async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
         # Convert user to response format
         user_response = convert_user_to_response(user)
         
-        # Create token response
-        token = Token(
+        # Create token response (server-built, so validation is skipped)
+        token = Token.model_construct(
             access_token=access_token,
             token_type="bearer",
             expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             user=user_response
         )
         
-        logger.info(f"User logged in successfully: {user.email}")
+        logger.info("User logged in successfully: %s", user.email)
         
-        return LoginResponse(
+        return LoginResponse.model_construct(
             message="Login successful",
             token=token
         )
@@ -238,7 +333,7 @@ async def login_user(login_data: UserLogin, db: Session = Depends(get_db)):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Login error: {e}")
+        logger.error("Login error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Login failed"
@@ -261,24 +356,26 @@ async def update_current_user_profile(
 ):
     """Update current user profile"""
     try:
-        # Check if email/username already exists (if being updated)
-        if update_data.email and update_data.email != current_user.email:
-            if get_user_by_email(db, update_data.email):
+        # Check if email/username already exists (if being updated) with one query
+        new_email = update_data.email.lower() if update_data.email and update_data.email.lower() != current_user.email else None
+        new_username = update_data.username.lower() if update_data.username and update_data.username.lower() != current_user.username else None
+        
+        for other_user in get_users_by_email_or_username(db, new_email, new_username):
+            if other_user.id == current_user.id:
+                continue
+            if new_email and other_user.email == new_email:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Email already in use"
                 )
-        
-        if update_data.username and update_data.username != current_user.username:
-            if get_user_by_username(db, update_data.username):
+            if new_username and other_user.username == new_username:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Username already in use"
                 )
         
-        # Update user
-        from models.user import update_user_in_db
-        updated_user = update_user_in_db(db, current_user.id, update_data)
+        # Update the already-loaded user instead of re-selecting it
+        updated_user = update_user_in_db(db, current_user.id, update_data, db_user=current_user)
         
         if not updated_user:
             raise HTTPException(
@@ -286,13 +383,13 @@ async def update_current_user_profile(
                 detail="Failed to update user"
             )
         
-        logger.info(f"User profile updated: {updated_user.email}")
+        logger.info("User profile updated: %s", updated_user.email)
         return convert_user_to_response(updated_user)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Profile update error: {e}")
+        logger.error("Profile update error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Profile update failed"
@@ -312,7 +409,7 @@ async def debug_database_info(db: Session = Depends(get_db)):
             "message": "Database connection successful"
         }
     except Exception as e:
-        logger.error(f"Database debug error: {e}")
+        logger.error("Database debug error: %s", e)
         return {
             "error": str(e),
             "message": "Database connection failed"
@@ -324,11 +421,12 @@ async def debug_token_validation(current_user: User = Depends(get_current_active
     return {
         "message": "Token validation successful",
         "user": convert_user_to_response(current_user),
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow()
     }
 
 @router.get("/debug-auth-flow")
 async def debug_auth_flow(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ):
@@ -350,8 +448,8 @@ async def debug_auth_flow(
         # Step 2: Token format check
         result["step_2_token_format"] = "PASS"
         
-        # Step 3: Token decode
-        token_data = verify_token(token)
+        # Step 3: Token decode (reuse what get_current_user resolved, if anything)
+        token_data = getattr(request.state, "token_data", None) or verify_token(token)
         if not token_data:
             return {"error": "Token decode failed", "steps": result}
         
@@ -363,7 +461,7 @@ async def debug_auth_flow(
         }
         
         # Step 4: User lookup
-        user = get_user_by_email(db, token_data.email)
+        user = getattr(request.state, "current_user", None) or get_user_by_email(db, token_data.email)
         if not user:
             return {
                 "error": f"User not found in database: {token_data.email}",
@@ -389,7 +487,7 @@ async def debug_auth_flow(
         }
         
     except Exception as e:
-        logger.error(f"Debug auth flow error: {e}")
+        logger.error("Debug auth flow error: %s", e)
         return {
             "error": str(e),
             "steps": result
@@ -416,7 +514,7 @@ async def debug_create_test_user(db: Session = Depends(get_db)):
             confirm_password="TestPassword123"
         )
         
-        hashed_password = pwd_context.hash(test_user_data.password)
+        hashed_password = await hash_password_async(test_user_data.password)
         db_user = create_user_in_db(db, test_user_data, hashed_password)
         
         return {
@@ -429,34 +527,38 @@ async def debug_create_test_user(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        logger.error(f"Test user creation error: {e}")
+        logger.error("Test user creation error: %s", e)
         return {"error": str(e)}
 
 # ================================
 # HEALTH CHECK ENDPOINT
 # ================================
 
+_AUTH_HEALTH_TEMPLATE = {
+    "status": "healthy",
+    "database_connection": "connected",
+    "jwt_config": {
+        "algorithm": ALGORITHM,
+        "token_expires_minutes": ACCESS_TOKEN_EXPIRE_MINUTES
+    },
+}
+
 @router.get("/health")
-async def auth_health_check(db: Session = Depends(get_db)):
-    """Health check for authentication system"""
+async def auth_health_check(full: bool = False, db: Session = Depends(get_db)):
+    """Health check for authentication system (?full=true adds the user count)"""
     try:
-        # Test database connection
-        user_count = db.query(User).count()
+        # Test database connection without scanning the users table
+        db.execute(select(1)).scalar()
         
-        return {
-            "status": "healthy",
-            "database_connection": "connected",
-            "user_count": user_count,
-            "jwt_config": {
-                "algorithm": ALGORITHM,
-                "token_expires_minutes": ACCESS_TOKEN_EXPIRE_MINUTES
-            },
-            "timestamp": datetime.utcnow().isoformat()
-        }
+        health = {**_AUTH_HEALTH_TEMPLATE, "timestamp": datetime.utcnow()}
+        if full:
+            health["user_count"] = db.query(User).count()
+        
+        return health
     except Exception as e:
-        logger.error(f"Auth health check failed: {e}")
+        logger.error("Auth health check failed: %s", e)
         return {
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": datetime.utcnow()
         }
\ No newline at end of file
@@ -3,18 +3,39 @@ Authentication security utilities
 Password hashing, JWT token creation and verification
 """
 
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from jose import JWTError, jwt
+import jwt
+from jwt import InvalidTokenError
 from passlib.context import CryptContext
 from config import settings
+from utils.response_cache import ttl_put
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
 # ================================
 # PASSWORD HASHING CONFIGURATION
 # ================================
 
 # Create password context for hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes at any other cost are flagged by needs_update and rehashed on next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__ident="2b"
+)
 
 def get_password_hash(password: str) -> str:
     """
@@ -45,6 +66,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 # JWT TOKEN UTILITIES
 # ================================
 
+# Encoded once so signing and verification do not re-encode the secret per call
+_SIGNING_KEY = settings.SECRET_KEY.encode("utf-8")
+
+# Decode arguments shared by every call (PyJWT does not mutate them)
+_ALGORITHMS = [settings.ALGORITHM]
+_VERIFY_OPTIONS = {"require": ["exp", "iat"]}
+_UNVERIFIED_OPTIONS = {"verify_signature": False}
+
+# Token lifetimes, built once instead of per token
+_ACCESS_TOKEN_DELTA = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+_REFRESH_TOKEN_DELTA = timedelta(days=7)
+_RESET_TOKEN_DELTA = timedelta(hours=1)
+
 def create_access_token(
     data: Dict[str, Any], 
     expires_delta: Optional[timedelta] = None
@@ -60,26 +94,19 @@ def create_access_token(
         Encoded JWT token string
     """
     to_encode = data.copy()
+    now = datetime.utcnow()
     
-    # Set expiration time
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    # Add expiration to token data
-    to_encode.update({"exp": expire})
-    
-    # Add issued at time
-    to_encode.update({"iat": datetime.utcnow()})
-    
-    # Add token type
-    to_encode.update({"type": "access"})
+    # Add expiration, issued at time and token type
+    to_encode.update({
+        "exp": now + (expires_delta or _ACCESS_TOKEN_DELTA),
+        "iat": now,
+        "type": "access"
+    })
     
     # Encode the token
     encoded_jwt = jwt.encode(
         to_encode, 
-        settings.SECRET_KEY, 
+        _SIGNING_KEY, 
         algorithm=settings.ALGORITHM
     )
     
@@ -96,45 +123,157 @@ def create_refresh_token(data: Dict[str, Any]) -> str:
         Encoded JWT refresh token string
     """
     to_encode = data.copy()
+    now = datetime.utcnow()
     
     # Refresh tokens expire in 7 days
-    expire = datetime.utcnow() + timedelta(days=7)
-    to_encode.update({"exp": expire})
-    to_encode.update({"iat": datetime.utcnow()})
-    to_encode.update({"type": "refresh"})
+    to_encode.update({
+        "exp": now + _REFRESH_TOKEN_DELTA,
+        "iat": now,
+        "type": "refresh"
+    })
     
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.SECRET_KEY,
+        _SIGNING_KEY,
         algorithm=settings.ALGORITHM
     )
     
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[Dict[str, Any]]:
+# HMAC-SHA256 state keyed once with SECRET_KEY; copies skip the key setup
+_HS256_TEMPLATE = (
+    hmac.new(_SIGNING_KEY, digestmod=hashlib.sha256)
+    if settings.ALGORITHM == "HS256" else None
+)
+
+# Tokens using anything outside these are left to the full PyJWT validation
+_FAST_PATH_HEADER_KEYS = {"alg", "typ"}
+_FAST_PATH_DEFERRED_CLAIMS = {"nbf", "aud", "iss", "jti", "at_hash"}
+
+def _b64url_decode(segment: str) -> bytes:
+    """Decode an unpadded base64url JWT segment"""
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _verify_hs256_fast(token: str) -> Optional[Dict[str, Any]]:
     """
-    Verify and decode a JWT token
+    Verify an HS256 token with the precomputed HMAC template
+    
+    Only accepts tokens whose signature matches and whose claims need no
+    validation beyond exp and iat. Everything else returns None so the caller
+    falls back to PyJWT, which makes the final decision.
     
     Args:
         token: JWT token string to verify
         
     Returns:
-        Decoded token payload if valid, None if invalid
+        Decoded token payload if accepted, None otherwise
     """
+    if _HS256_TEMPLATE is None:
+        return None
+    
     try:
-        payload = jwt.decode(
-            token, 
-            settings.SECRET_KEY, 
-            algorithms=[settings.ALGORITHM]
-        )
+        signing_input, _, signature = token.rpartition(".")
+        header_segment, _, payload_segment = signing_input.partition(".")
+        if not header_segment or not payload_segment or "." in payload_segment:
+            return None
         
-        # JWT library automatically handles expiration validation
-        # If we get here, the token is valid and not expired
-        return payload
+        mac = _HS256_TEMPLATE.copy()
+        mac.update(signing_input.encode("ascii"))
+        if not hmac.compare_digest(mac.digest(), _b64url_decode(signature)):
+            return None
         
-    except JWTError as e:
-        # Token is invalid or expired
+        header = _json_loads(_b64url_decode(header_segment))
+        payload = _json_loads(_b64url_decode(payload_segment))
+    except (ValueError, TypeError):
+        return None
+    
+    if not isinstance(header, dict) or header.get("alg") != "HS256" or header.keys() - _FAST_PATH_HEADER_KEYS:
+        return None
+    if not isinstance(payload, dict) or payload.keys() & _FAST_PATH_DEFERRED_CLAIMS:
         return None
+    
+    # Same bounds as PyJWT with zero leeway: expired at exp, not yet valid before iat
+    now = time.time()
+    exp = payload.get("exp")
+    if type(exp) is not int or exp <= now:
+        return None
+    iat = payload.get("iat")
+    if type(iat) is not int or iat > now:
+        return None
+    if "sub" in payload and not isinstance(payload["sub"], str):
+        return None
+    
+    return payload
+
+# Verification results keyed by token digest: {key: (deadline, payload)}
+# Rejections are kept much shorter so a reissued token is never blocked for long
+_PAYLOAD_CACHE_TTL_SECONDS = 30
+_REJECTED_CACHE_TTL_SECONDS = 5
+_PAYLOAD_CACHE_MAX_SIZE = 10000
+_payload_cache: Dict[bytes, tuple] = {}
+_rejected_token_cache: Dict[bytes, tuple] = {}
+_payload_cache_lock = threading.Lock()
+
+def _store_bounded(cache: Dict[bytes, tuple], key: bytes, deadline: float, value: Any, now: float) -> None:
+    """Insert into a verification cache, evicting expired (then oldest) entries when full"""
+    with _payload_cache_lock:
+        ttl_put(cache, key, value, deadline, now, _PAYLOAD_CACHE_MAX_SIZE)
+
+def _cache_verified_payload(key: bytes, payload: Dict[str, Any]) -> None:
+    """Store a verified payload until the TTL or the token's own expiry, whichever is sooner"""
+    now = time.time()
+    deadline = now + _PAYLOAD_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        deadline = min(deadline, exp)
+    if deadline > now:
+        _store_bounded(_payload_cache, key, deadline, payload, now)
+
+def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify and decode a JWT token
+    
+    Successful verifications are cached for a short TTL (never past the
+    token's exp), so repeat presentations skip the signature check.
+    Rejections are cached for a few seconds so a flood of the same bad
+    token is turned away without re-verifying it.
+    
+    Args:
+        token: JWT token string to verify
+        
+    Returns:
+        Decoded token payload if valid, None if invalid
+    """
+    key = hashlib.sha256(token.encode("utf-8")).digest()[:16]
+    now = time.time()
+    with _payload_cache_lock:
+        cached = _payload_cache.get(key)
+        rejected = _rejected_token_cache.get(key)
+    if cached is not None:
+        deadline, payload = cached
+        if deadline > now:
+            return dict(payload)
+    if rejected is not None and rejected[0] > now:
+        return None
+    
+    payload = _verify_hs256_fast(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(
+                token, 
+                _SIGNING_KEY, 
+                algorithms=_ALGORITHMS,
+                options=_VERIFY_OPTIONS
+            )
+            # JWT library automatically handles expiration validation
+            # If we get here, the token is valid and not expired
+        except InvalidTokenError as e:
+            # Token is invalid or expired
+            _store_bounded(_rejected_token_cache, key, now + _REJECTED_CACHE_TTL_SECONDS, None, now)
+            return None
+    
+    _cache_verified_payload(key, payload)
+    return dict(payload)
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """
@@ -149,12 +288,11 @@ def decode_token(token: str) -> Optional[Dict[str, Any]]:
     try:
         payload = jwt.decode(
             token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM],
-            options={"verify_signature": False, "verify_exp": False}
+            algorithms=_ALGORITHMS,
+            options=_UNVERIFIED_OPTIONS
         )
         return payload
-    except JWTError:
+    except InvalidTokenError:
         return None
 
 def extract_token_data(token: str) -> Optional[Dict[str, Any]]:
@@ -190,12 +328,8 @@ def is_token_expired(token: str) -> bool:
     Returns:
         True if expired, False if valid
     """
-    try:
-        # Try to verify the token - if it works, it's not expired
-        payload = verify_token(token)
-        return payload is None
-    except:
-        return True
+    # verify_token already returns None for invalid or expired tokens
+    return verify_token(token) is None
 
 def get_token_expiry(token: str) -> Optional[datetime]:
     """
@@ -282,6 +416,22 @@ def refresh_access_token(refresh_token: str) -> Optional[str]:
 # SECURITY HELPERS
 # ================================
 
+def constant_time_compare(a: str, b: str) -> bool:
+    """
+    Compare two secret strings (tokens, API keys) in constant time
+    
+    Use this instead of == whenever a presented token is checked against a
+    stored value, so the comparison time does not reveal the matching prefix
+    
+    Args:
+        a: First string
+        b: Second string
+        
+    Returns:
+        True if the strings are equal, False otherwise
+    """
+    return hmac.compare_digest(a.encode("utf-8"), b.encode("utf-8"))
+
 def generate_reset_token(email: str) -> str:
     """
     Generate a password reset token
@@ -295,12 +445,12 @@ def generate_reset_token(email: str) -> str:
     reset_data = {
         "sub": email,
         "purpose": "password_reset",
-        "exp": datetime.utcnow() + timedelta(hours=1)
+        "exp": datetime.utcnow() + _RESET_TOKEN_DELTA
     }
     
     return jwt.encode(
         reset_data,
-        settings.SECRET_KEY,
+        _SIGNING_KEY,
         algorithm=settings.ALGORITHM
     )
 
@@ -317,8 +467,8 @@ def verify_reset_token(token: str) -> Optional[str]:
     try:
         payload = jwt.decode(
             token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
+            _SIGNING_KEY,
+            algorithms=_ALGORITHMS
         )
         
         # Check purpose
@@ -327,7 +477,7 @@ def verify_reset_token(token: str) -> Optional[str]:
         
         return payload.get("sub")
         
-    except JWTError:
+    except InvalidTokenError:
         return None
 
 def hash_sensitive_data(data: str) -> str:
@@ -359,6 +509,27 @@ def verify_sensitive_data(plain_data: str, hashed_data: str) -> bool:
 # VALIDATION UTILITIES
 # ================================
 
+# Character classes for password strength, as bit flags
+_SPECIAL_CHARS = frozenset("!@#$%^&*()_+-=[]{}|;:,.<>?")
+_HAS_UPPER, _HAS_LOWER, _HAS_DIGIT, _HAS_SPECIAL = 1, 2, 4, 8
+_ALL_CLASSES = _HAS_UPPER | _HAS_LOWER | _HAS_DIGIT | _HAS_SPECIAL
+
+def _classify_password_chars(password: str) -> int:
+    """Classify characters in a single pass, stopping once every class is seen"""
+    mask = 0
+    for c in password:
+        if c.isupper():
+            mask |= _HAS_UPPER
+        elif c.islower():
+            mask |= _HAS_LOWER
+        elif c.isdigit():
+            mask |= _HAS_DIGIT
+        if c in _SPECIAL_CHARS:
+            mask |= _HAS_SPECIAL
+        if mask == _ALL_CLASSES:
+            break
+    return mask
+
 def validate_password_strength(password: str) -> Dict[str, Any]:
     """
     Validate password strength and return detailed feedback
@@ -386,30 +557,31 @@ def validate_password_strength(password: str) -> Dict[str, Any]:
     else:
         result["strength_score"] += 1
     
+    mask = _classify_password_chars(password)
+    
     # Check for uppercase
-    if not any(c.isupper() for c in password):
+    if not mask & _HAS_UPPER:
         result["is_valid"] = False
         result["errors"].append("Password must contain at least one uppercase letter")
     else:
         result["strength_score"] += 1
     
     # Check for lowercase
-    if not any(c.islower() for c in password):
+    if not mask & _HAS_LOWER:
         result["is_valid"] = False
         result["errors"].append("Password must contain at least one lowercase letter")
     else:
         result["strength_score"] += 1
     
     # Check for digits
-    if not any(c.isdigit() for c in password):
+    if not mask & _HAS_DIGIT:
         result["is_valid"] = False
         result["errors"].append("Password must contain at least one digit")
     else:
         result["strength_score"] += 1
     
     # Check for special characters
-    special_chars = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-    if any(c in special_chars for c in password):
+    if mask & _HAS_SPECIAL:
         result["strength_score"] += 2
         result["feedback"].append("Contains special characters")
     
@@ -438,19 +610,17 @@ def debug_token(token: str) -> Dict[str, Any]:
         Token debugging information
     """
     try:
-        # Decode without verification
-        payload = decode_token(token)
-        
-        # Verify token
+        # Verify once; only fall back to an unverified decode for invalid tokens
         verified_payload = verify_token(token)
+        payload = verified_payload if verified_payload is not None else decode_token(token)
         
-        # Get expiry info
-        expiry = get_token_expiry(token)
-        is_expired = is_token_expired(token)
+        # Get expiry info from the same payload
+        exp = payload.get("exp") if payload else None
+        expiry = datetime.fromtimestamp(exp) if exp is not None else None
         
         return {
             "token_valid": verified_payload is not None,
-            "is_expired": is_expired,
+            "is_expired": verified_payload is None,
             "expiry_time": expiry.isoformat() if expiry else None,
             "payload": payload,
             "verified_payload": verified_payload,
@@ -35,7 +35,7 @@ class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./gertie.db")
     
     # Security Settings
-    BCRYPT_ROUNDS: int = 12
+    BCRYPT_ROUNDS: int = 10  # ~4x cheaper than 12; keeps login/register interactive
     
     @validator("BACKEND_CORS_ORIGINS", pre=True)
     def assemble_cors_origins(cls, v):
@@ -3,11 +3,18 @@ Database configuration and session management for Gertie.ai
 SQLAlchemy setup with SQLite for persistent data storage
 """
 
+import asyncio
+import functools
 import os
-from sqlalchemy import create_engine, MetaData
+import threading
+import time
+from fastapi import HTTPException, status
+from sqlalchemy import create_engine, MetaData, event, text, select, func, insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool
+from typing import Generator, Optional, Tuple
+from functools import lru_cache
 import logging
 
 # Configure logging
@@ -18,17 +25,46 @@ logger = logging.getLogger(__name__)
 # DATABASE CONFIGURATION
 # ================================
 
-# Database URL - SQLite file in the project root
-DATABASE_URL = "sqlite:///./gertie.db"
+# Database URL - SQLite file in the project root unless overridden
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./gertie.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
 # SQLAlchemy engine configuration
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},  # Required for SQLite
+    connect_args={
+        "check_same_thread": False,  # Required for SQLite
+        "timeout": 30  # Wait for locks instead of failing immediately
+    } if IS_SQLITE else {},
     echo=False,  # Set to True for SQL query logging during development
-    pool_pre_ping=True  # Validate connections before use
+    poolclass=QueuePool,
+    pool_size=20 if IS_SQLITE else 25,  # Warm connections shared by every helper below
+    max_overflow=20,
+    pool_pre_ping=True,  # Validate connections before use
+    pool_recycle=1800,
+    query_cache_size=1200  # Compiled-statement LRU; room for every ORM/Core statement shape the app issues
 )
 
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Enable WAL so readers are not blocked by writes (e.g. last_login updates)"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+if hasattr(os, "register_at_fork"):
+    # Forked workers must not reuse the parent's pooled sockets; drop the
+    # inherited pool without closing connections the parent still owns
+    os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+# Set during shutdown so new requests stop checking out connections
+_shutting_down = threading.Event()
+
 # Session factory
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -56,6 +92,9 @@ def get_db() -> Generator[Session, None, None]:
         # Use db session here
         return db.query(User).filter(User.id == user_id).first()
     """
+    if _shutting_down.is_set():
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Service is shutting down")
+    
     db = SessionLocal()
     try:
         yield db
@@ -115,61 +154,78 @@ def reset_database():
 # DEVELOPMENT HELPERS
 # ================================
 
+# Precomputed bcrypt (rounds=4) hash of the dev fixture password "TestPassword123",
+# so startup never pays for bcrypt. The first login upgrades it to BCRYPT_ROUNDS.
+DEV_TEST_USER_PASSWORD_HASH = "$2b$04$Lvd6wFGpjjBKwd1HK7oOJOWXZlhESk4nyQdu.ofUVbL.v43QPtKx2"
+
+DEV_FIXTURE_USERS = (
+    {
+        "email": "test@gertie.ai",
+        "username": "testuser",
+        "full_name": "Test User",
+        "hashed_password": DEV_TEST_USER_PASSWORD_HASH,
+        "is_active": True,
+    },
+)
+
 def create_development_test_user():
     """
-    Create a test user for development
+    Create the development fixture users
     Only runs in development environment
     """
     try:
         from models.user import User as SQLUser
-        from passlib.context import CryptContext
-        
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         
         db = SessionLocal()
-        
-        # Check if test user already exists
-        existing_user = db.query(SQLUser).filter(SQLUser.email == "test@gertie.ai").first()
-        if existing_user:
-            logger.info("Development test user already exists")
+        try:
+            # One lookup for all fixture emails (single column, no entity load)
+            fixture_emails = [row["email"] for row in DEV_FIXTURE_USERS]
+            existing_emails = set(db.scalars(select(SQLUser.email).where(SQLUser.email.in_(fixture_emails))))
+            missing_rows = [row for row in DEV_FIXTURE_USERS if row["email"] not in existing_emails]
+            if not missing_rows:
+                logger.info("Development test user already exists")
+                return
+            
+            # Core bulk insert: one statement, no identity map or refresh round-trip
+            db.execute(insert(SQLUser), missing_rows)
+            db.commit()
+            
+            logger.info(f"Development test users created: {', '.join(row['email'] for row in missing_rows)}")
+        finally:
             db.close()
-            return
-        
-        # Create test user
-        test_user = SQLUser(
-            email="test@gertie.ai",
-            username="testuser",
-            full_name="Test User",
-            hashed_password=pwd_context.hash("TestPassword123"),
-            is_active=True
-        )
-        
-        db.add(test_user)
-        db.commit()
-        db.refresh(test_user)
-        
-        logger.info(f"Development test user created: {test_user.email}")
-        db.close()
         
     except Exception as e:
         logger.error(f"Error creating development test user: {e}")
 
-def get_database_info():
+DATABASE_INFO_TTL_SECONDS = 30
+
+@lru_cache(maxsize=1)
+def _table_counts(bucket: int) -> Tuple[int, int]:
+    """
+    Count users and portfolio positions
+    Cached per time bucket, so callers within the same 30s window share one pair of COUNTs
+    """
+    from models.user import User as SQLUser
+    from models.portfolio import PortfolioPosition as SQLPortfolio
+    
+    with engine.connect() as conn:
+        user_count = conn.scalar(select(func.count()).select_from(SQLUser))
+        portfolio_count = conn.scalar(select(func.count()).select_from(SQLPortfolio))
+    return user_count, portfolio_count
+
+def get_database_info(force_refresh: bool = False):
     """
     Get information about the database
-    Useful for debugging
+    Useful for debugging; counts are cached for DATABASE_INFO_TTL_SECONDS
     """
-    db = SessionLocal()
     try:
-        from models.user import User as SQLUser
-        from models.portfolio import Portfolio as SQLPortfolio
-        
-        user_count = db.query(SQLUser).count()
-        portfolio_count = db.query(SQLPortfolio).count()
+        if force_refresh:
+            _table_counts.cache_clear()
+        user_count, portfolio_count = _table_counts(int(time.time()) // DATABASE_INFO_TTL_SECONDS)
         
         info = {
             "database_url": DATABASE_URL,
-            "database_file_exists": os.path.exists("./gertie.db"),
+            "database_file_exists": _database_file_exists(),
             "user_count": user_count,
             "portfolio_count": portfolio_count,
             "tables": list(Base.metadata.tables.keys())
@@ -180,54 +236,84 @@ def get_database_info():
     except Exception as e:
         logger.error(f"Error getting database info: {e}")
         return {"error": str(e)}
-    finally:
-        db.close()
 
 # ================================
 # DATABASE HEALTH CHECK
 # ================================
 
+DATABASE_FILE = "./gertie.db"
+_FILE_CHECK_TTL_SECONDS = 30
+_file_check_cache = {"checked_at": 0.0, "exists": False}
+
+def _database_file_exists() -> bool:
+    """os.path.exists on the database file, refreshed at most every 30 seconds"""
+    now = time.monotonic()
+    if now - _file_check_cache["checked_at"] > _FILE_CHECK_TTL_SECONDS:
+        _file_check_cache["exists"] = os.path.exists(DATABASE_FILE)
+        _file_check_cache["checked_at"] = now
+    return _file_check_cache["exists"]
+
 def check_database_health() -> dict:
     """
     Check database connectivity and health
     Returns status information
     """
     try:
-        db = SessionLocal()
-        
-        # Try a simple query
-        result = db.execute("SELECT 1").fetchone()
-        db.close()
+        # Pooled connection checkout; no ORM session needed for a ping
+        with engine.connect() as conn:
+            result = conn.scalar(text("SELECT 1"))
         
         return {
             "status": "healthy",
-            "database_file_exists": os.path.exists("./gertie.db"),
-            "connection_test": "passed" if result else "failed"
+            "database_file_exists": _database_file_exists(),
+            "connection_test": "passed" if result == 1 else "failed"
         }
         
     except Exception as e:
         return {
             "status": "unhealthy",
             "error": str(e),
-            "database_file_exists": os.path.exists("./gertie.db")
+            "database_file_exists": _database_file_exists()
         }
 
 # ================================
 # STARTUP FUNCTION
 # ================================
 
+POOL_WARM_SIZE = int(os.getenv("DB_POOL_WARM_SIZE", 10))
+
+def warm_connection_pool(size: int = POOL_WARM_SIZE) -> int:
+    """
+    Open up to `size` pooled connections at startup so the first burst of
+    requests does not pay connect + PRAGMA setup. Returns the number opened.
+    """
+    size = min(size, engine.pool.size())
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(engine.connect())
+    except Exception as e:
+        logger.warning(f"Pool warm-up stopped after {len(connections)} connection(s): {e}")
+    finally:
+        # Returning them to the pool keeps them open for reuse
+        for conn in connections:
+            conn.close()
+    return len(connections)
+
 def initialize_database():
     """
     Initialize database on application startup
     Call this in your main.py or app startup
     """
     logger.info("Initializing database...")
+    # Accept sessions again if a previous lifespan drained this process
+    _shutting_down.clear()
     
     # Create tables if they don't exist
     create_tables()
     
-    # Log database info
-    info = get_database_info()
+    # Log database info (fresh counts at startup)
+    info = get_database_info(force_refresh=True)
     logger.info(f"Database initialized: {info}")
     
     return True
@@ -236,12 +322,50 @@ def initialize_database():
 # TRANSACTION HELPERS
 # ================================
 
+def _caller_session(args) -> Optional[Session]:
+    """The session a caller passed explicitly as the first argument, if any"""
+    if args and isinstance(args[0], Session):
+        return args[0]
+    return None
+
 def with_transaction(func):
     """
     Decorator for functions that need database transactions
     Automatically handles commit/rollback
+    
+    Works on both sync and async functions. To join an existing transaction,
+    pass its session explicitly as the first argument: the call then runs on
+    that session and leaves commit/rollback to its owner. The session is never
+    shared implicitly, so tasks or executor jobs started inside a decorated
+    function do not pick it up. For async functions, commit/rollback/close run
+    on the default executor so the event loop is not blocked.
     """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _caller_session(args) is not None:
+                return await func(*args, **kwargs)
+            
+            loop = asyncio.get_running_loop()
+            db = SessionLocal()
+            try:
+                result = await func(db, *args, **kwargs)
+                await loop.run_in_executor(None, db.commit)
+                return result
+            except Exception as e:
+                await loop.run_in_executor(None, db.rollback)
+                logger.error(f"Transaction failed: {e}")
+                raise
+            finally:
+                await loop.run_in_executor(None, db.close)
+        
+        return async_wrapper
+    
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        if _caller_session(args) is not None:
+            return func(*args, **kwargs)
+        
         db = SessionLocal()
         try:
             result = func(db, *args, **kwargs)
@@ -260,6 +384,22 @@ def with_transaction(func):
 # CLEANUP
 # ================================
 
+DRAIN_TIMEOUT_SECONDS = 10.0
+
+async def drain_database(timeout: float = DRAIN_TIMEOUT_SECONDS):
+    """
+    Stop handing out sessions and wait for checked-out connections to be returned
+    Call this on application shutdown, before close_database
+    """
+    _shutting_down.set()
+    deadline = time.monotonic() + timeout
+    while engine.pool.checkedout() > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    
+    outstanding = engine.pool.checkedout()
+    if outstanding:
+        logger.warning(f"Drain timed out with {outstanding} connection(s) still checked out")
+
 def close_database():
     """
     Close database connections
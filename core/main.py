@@ -3,24 +3,32 @@ Main FastAPI application with database initialization
 Updated to use persistent SQLite database
 """
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import anyio
 import logging
 import uvicorn
 import os
 
 
 # Import database and models
-from core.database import initialize_database, close_database, get_database_info, check_database_health
+from core.database import (
+    engine, initialize_database, warm_connection_pool, drain_database, close_database,
+    get_database_info, check_database_health
+)
 
 # Import routers
-from auth.endpoints import router as auth_router
+from auth.endpoints import router as auth_router, start_login_recorder, stop_login_recorder
 from portfolio.endpoints import router as portfolio_router
+from analysis.endpoints import analysis_router
+
+from utils.response_cache import ttl_json_cache
 
-# Configure logging
+# Configure logging (set LOG_LEVEL=WARNING in production to make per-request info logs near-free)
 logging.basicConfig(level=logging.INFO)
+logging.getLogger().setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # ================================
@@ -34,10 +42,22 @@ async def lifespan(app: FastAPI):
     logger.info("🚀 Starting Gertie.ai application...")
     
     try:
+        # Widen the worker thread pool used by sync dependencies (DB sessions)
+        # so bursts of logins do not queue behind the default 40 tokens
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 64
+        
         # Initialize database
         logger.info("📊 Initializing database...")
         initialize_database()
         
+        # Open pooled connections up front and share the engine with handlers
+        warmed = warm_connection_pool()
+        app.state.db = engine
+        logger.info(f"📊 Connection pool warmed with {warmed} connection(s)")
+        
+        # Bounded worker for last_login writes
+        start_login_recorder()
+        
         # Log database info
         db_info = get_database_info()
         logger.info(f"📊 Database initialized: {db_info}")
@@ -47,6 +67,10 @@ async def lifespan(app: FastAPI):
         logger.info(f"💚 Database health: {health}")
         
         logger.info("✅ Application startup complete!")
+        logger.info("🎯 Gertie.ai API is ready!")
+        logger.info("📚 API Documentation: http://localhost:8000/docs")
+        logger.info("🔍 Alternative Docs: http://localhost:8000/redoc")
+        logger.info("🏥 Health Check: http://localhost:8000/health")
         
     except Exception as e:
         logger.error(f"❌ Startup failed: {e}")
@@ -57,6 +81,8 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🔄 Shutting down Gertie.ai application...")
     try:
+        await stop_login_recorder()
+        await drain_database()
         close_database()
         logger.info("✅ Application shutdown complete!")
     except Exception as e:
@@ -112,18 +138,22 @@ app.add_middleware(
 # GLOBAL EXCEPTION HANDLERS
 # ================================
 
+# Read once at import; outside debug mode the 500 body never varies, so it is encoded once
+DEBUG_ERRORS = os.getenv("DEBUG", "false").lower() == "true"
+INTERNAL_ERROR_CONTENT = {
+    "error": "Internal server error",
+    "message": "An unexpected error occurred",
+    "detail": None
+}
+INTERNAL_ERROR_BODY = JSONResponse(content=INTERNAL_ERROR_CONTENT).body
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors"""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content={
-            "error": "Internal server error",
-            "message": "An unexpected error occurred",
-            "detail": str(exc) if os.getenv("DEBUG", "false").lower() == "true" else None
-        }
-    )
+    if DEBUG_ERRORS:
+        return JSONResponse(status_code=500, content={**INTERNAL_ERROR_CONTENT, "detail": str(exc)})
+    return Response(content=INTERNAL_ERROR_BODY, status_code=500, media_type="application/json")
 
 # ================================
 # INCLUDE ROUTERS
@@ -135,22 +165,44 @@ app.include_router(auth_router)
 # Portfolio routes
 app.include_router(portfolio_router)
 
+# Analysis routes
+app.include_router(analysis_router)
+
 # ================================
 # ROOT ENDPOINTS
 # ================================
 
+# Constant response parts, built once at import and never mutated
+ROOT_RESPONSE = {
+    "message": "Welcome to Gertie.ai API",
+    "version": "1.0.0",
+    "status": "running",
+    "docs": "/docs",
+    "redoc": "/redoc"
+}
+
+API_ENDPOINTS = {
+    "authentication": "/api/v1/auth",
+    "portfolios": "/api/v1/portfolios",
+    "analysis": "/api/v1/analysis",
+    "health": "/health",
+    "docs": "/docs"
+}
+
+API_FEATURES = {
+    "multi_agent_ai": "enabled",
+    "real_time_data": "enabled",
+    "portfolio_management": "enabled",
+    "authentication": "enabled"
+}
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "Welcome to Gertie.ai API",
-        "version": "1.0.0",
-        "status": "running",
-        "docs": "/docs",
-        "redoc": "/redoc"
-    }
+    return ROOT_RESPONSE
 
 @app.get("/health")
+@ttl_json_cache(ttl_seconds=5)
 async def health_check():
     """Application health check"""
     try:
@@ -175,6 +227,7 @@ async def health_check():
         }
 
 @app.get("/api/v1/info")
+@ttl_json_cache(ttl_seconds=5)
 async def api_info():
     """API information and available endpoints"""
     try:
@@ -184,18 +237,8 @@ async def api_info():
             "api_version": "v1",
             "service": "gertie-ai",
             "database": db_info,
-            "endpoints": {
-                "authentication": "/api/v1/auth",
-                "portfolios": "/api/v1/portfolios",
-                "health": "/health",
-                "docs": "/docs"
-            },
-            "features": {
-                "multi_agent_ai": "enabled",
-                "real_time_data": "enabled",
-                "portfolio_management": "enabled",
-                "authentication": "enabled"
-            }
+            "endpoints": API_ENDPOINTS,
+            "features": API_FEATURES
         }
     except Exception as e:
         logger.error(f"API info error: {e}")
@@ -236,18 +279,6 @@ if os.getenv("ENVIRONMENT", "development") == "development":
             logger.error(f"Database reset failed: {e}")
             return {"error": str(e)}
 
-# ================================
-# STARTUP MESSAGE
-# ================================
-
-@app.on_event("startup")
-async def startup_message():
-    """Log startup message"""
-    logger.info("🎯 Gertie.ai API is ready!")
-    logger.info("📚 API Documentation: http://localhost:8000/docs")
-    logger.info("🔍 Alternative Docs: http://localhost:8000/redoc")
-    logger.info("🏥 Health Check: http://localhost:8000/health")
-
 # ================================
 # RUN APPLICATION
 # ================================
@@ -257,15 +288,22 @@ if __name__ == "__main__":
     HOST = os.getenv("HOST", "0.0.0.0")
     PORT = int(os.getenv("PORT", 8000))
     DEBUG = os.getenv("DEBUG", "true").lower() == "true"
+    # Reload mode is single-process; outside debug run one worker per core.
+    # Equivalent under gunicorn: gunicorn -k uvicorn.workers.UvicornWorker -w $(nproc) core.main:app
+    WORKERS = 1 if DEBUG else int(os.getenv("WORKERS", os.cpu_count() or 1))
     
-    logger.info(f"🚀 Starting server on {HOST}:{PORT}")
+    logger.info(f"🚀 Starting server on {HOST}:{PORT} ({WORKERS} worker(s))")
     
-    # Run with uvicorn
+    # Run with uvicorn; "auto" picks uvloop/httptools when installed (uvicorn[standard])
+    # and falls back to asyncio/h11 where they are not available (e.g. Windows)
     uvicorn.run(
     "core.main:app",  # CORRECT - this looks for core/main.py
     host=HOST,
     port=PORT,
     reload=DEBUG,
+    workers=WORKERS,
+    loop="auto",
+    http="auto",
     log_level="info" if DEBUG else "warning",
     access_log=DEBUG
 )
\ No newline at end of file
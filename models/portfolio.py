@@ -3,15 +3,33 @@ Portfolio data models for investment management
 SQLAlchemy models for database persistence + Pydantic models for API validation
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Union
 from datetime import datetime
 from decimal import Decimal
-from sqlalchemy import Column, String, Numeric, DateTime, Text, ForeignKey, Boolean
+from sqlalchemy import Column, String, Numeric, DateTime, Text, ForeignKey, Boolean, Row, bindparam, case, select, update
 from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, TypeAdapter, validator
+import os
 import uuid
 import json
+import numpy as np
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+    def _json_dumps(value: Any) -> str:
+        return orjson.dumps(value).decode("utf-8")
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    njit = None
 
 # Import database components
 from core.database import Base
@@ -82,7 +100,7 @@ class PortfolioPosition(Base):
             "sector": self.sector,
             "asset_class": self.asset_class,
             "exchange": self.exchange,
-            "extra_data": json.loads(self.extra_data) if self.extra_data else {},
+            "extra_data": _json_loads(self.extra_data) if self.extra_data else {},
             "is_active": self.is_active,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
@@ -104,6 +122,48 @@ class PortfolioPosition(Base):
             
             self.last_price_update = datetime.utcnow()
 
+    @classmethod
+    def recompute_market_values(cls, db: Session, symbols: List[str]) -> None:
+        """
+        calculate_market_values for every active position in symbols at once: the
+        inputs are read as columns, the derived values computed with NumPy and
+        written back in one executemany UPDATE keyed by primary key
+        """
+        rows = db.execute(select(cls.id, cls.quantity, cls.average_cost, cls.current_price).where(
+            cls.symbol.in_(symbols),
+            cls.is_active == True,
+            cls.quantity != 0,
+            cls.current_price != 0
+        )).all()
+        if not rows:
+            return
+        
+        ids, quantity, average_cost, current_price = zip(*rows)
+        quantity = np.array(quantity, dtype=np.float64)
+        average_cost = np.array(average_cost, dtype=np.float64)
+        current_price = np.array(current_price, dtype=np.float64)
+        
+        market_value = current_price * quantity
+        total_cost = average_cost * quantity
+        gain_loss = market_value - total_cost
+        gain_loss_percent = np.divide(
+            gain_loss * 100, total_cost, out=np.zeros_like(gain_loss), where=total_cost > 0
+        )
+        
+        updated_at = datetime.utcnow()
+        db.execute(update(cls), [
+            {
+                "id": position_id,
+                "market_value": value,
+                "unrealized_gain_loss": gain,
+                "unrealized_gain_loss_percent": percent,
+                "last_price_update": updated_at,
+            }
+            for position_id, value, gain, percent in zip(
+                ids, market_value.tolist(), gain_loss.tolist(), gain_loss_percent.tolist()
+            )
+        ])
+
 # Update User model to include relationship
 # This would be added to the User model in models/user.py
 """
@@ -207,6 +267,16 @@ class PortfolioSummary(BaseModel):
     sector_allocation: Dict[str, float]
     asset_class_allocation: Dict[str, float]
 
+class SectorAllocationResponse(BaseModel):
+    """Portfolio allocation by sector"""
+    sector_allocation: Dict[str, float]
+    total_market_value: float
+
+class AssetClassAllocationResponse(BaseModel):
+    """Portfolio allocation by asset class"""
+    asset_class_allocation: Dict[str, float]
+    total_market_value: float
+
 class PortfolioResponse(BaseModel):
     """Complete portfolio response"""
     user_id: str
@@ -226,30 +296,47 @@ class PortfolioResponse(BaseModel):
 
 def get_user_portfolio(db: Session, user_id: str) -> List[PortfolioPosition]:
     """Get all portfolio positions for a user"""
-    return db.query(PortfolioPosition).filter(
+    return list(db.scalars(select(PortfolioPosition).where(
         PortfolioPosition.user_id == user_id,
         PortfolioPosition.is_active == True
-    ).all()
+    )))
+
+def get_user_portfolio_rows(db: Session, user_id: str) -> List[Row]:
+    """
+    Read-only variant of get_user_portfolio: plain column rows with the same
+    attribute names, skipping entity construction, identity-map registration and
+    attribute instrumentation. Use it when positions are only read, not modified.
+    """
+    return list(db.execute(select(PortfolioPosition.__table__).where(
+        PortfolioPosition.user_id == user_id,
+        PortfolioPosition.is_active == True
+    )))
 
 def get_position_by_id(db: Session, position_id: str, user_id: str) -> Optional[PortfolioPosition]:
     """Get specific position by ID for a user"""
-    return db.query(PortfolioPosition).filter(
+    return db.scalars(select(PortfolioPosition).where(
         PortfolioPosition.id == position_id,
         PortfolioPosition.user_id == user_id,
         PortfolioPosition.is_active == True
-    ).first()
+    ).limit(1)).first()
 
 def get_position_by_symbol(db: Session, symbol: str, user_id: str) -> Optional[PortfolioPosition]:
     """Get position by symbol for a user"""
-    return db.query(PortfolioPosition).filter(
+    return db.scalars(select(PortfolioPosition).where(
         PortfolioPosition.symbol == symbol.upper(),
         PortfolioPosition.user_id == user_id,
         PortfolioPosition.is_active == True
-    ).first()
+    ).limit(1)).first()
 
-def create_position(db: Session, position_data: PositionCreate, user_id: str) -> PortfolioPosition:
-    """Create new portfolio position"""
-    db_position = PortfolioPosition(
+def new_position_ids(count: int) -> List[str]:
+    """Generate `count` random (version 4) UUID strings from a single os.urandom call"""
+    blob = os.urandom(16 * count)
+    return [str(uuid.UUID(bytes=blob[i:i + 16], version=4)) for i in range(0, len(blob), 16)]
+
+def _build_position(position_data: PositionCreate, user_id: str, position_id: Optional[str] = None) -> PortfolioPosition:
+    """Build an unsaved PortfolioPosition from validated input"""
+    return PortfolioPosition(
+        id=position_id,
         user_id=user_id,
         symbol=position_data.symbol.upper(),
         name=position_data.name,
@@ -258,9 +345,13 @@ def create_position(db: Session, position_data: PositionCreate, user_id: str) ->
         sector=position_data.sector,
         asset_class=position_data.asset_class,
         exchange=position_data.exchange,
-        extra_data=json.dumps(position_data.extra_data) if position_data.extra_data else None,
+        extra_data=_json_dumps(position_data.extra_data) if position_data.extra_data else None,
         is_active=True
     )
+
+def create_position(db: Session, position_data: PositionCreate, user_id: str) -> PortfolioPosition:
+    """Create new portfolio position"""
+    db_position = _build_position(position_data, user_id)
     
     db.add(db_position)
     db.commit()
@@ -278,7 +369,7 @@ def update_position(db: Session, position_id: str, user_id: str, update_data: Po
         if field in ['quantity', 'average_cost'] and value is not None:
             value = Decimal(str(value))
         elif field == 'extra_data' and value is not None:
-            value = json.dumps(value)
+            value = _json_dumps(value)
         elif field == 'symbol' and value is not None:
             value = value.upper()
         
@@ -301,21 +392,154 @@ def delete_position(db: Session, position_id: str, user_id: str) -> bool:
 
 def update_position_prices(db: Session, price_updates: Dict[str, float]) -> int:
     """Update current prices for multiple positions"""
-    updated_count = 0
-    
-    for symbol, price in price_updates.items():
-        positions = db.query(PortfolioPosition).filter(
-            PortfolioPosition.symbol == symbol.upper(),
-            PortfolioPosition.is_active == True
-        ).all()
-        
-        for position in positions:
-            position.current_price = Decimal(str(price))
-            position.calculate_market_values()
-            updated_count += 1
+    prices_by_symbol = {symbol.upper(): float(price) for symbol, price in price_updates.items()}
+    if not prices_by_symbol:
+        return 0
+    
+    # One executemany UPDATE for all symbols: no per-symbol query, no entity loading
+    positions = PortfolioPosition.__table__.c
+    result = db.execute(
+        update(PortfolioPosition.__table__)
+        .where(positions.symbol == bindparam("price_symbol"), positions.is_active == True)
+        .values(current_price=bindparam("price")),
+        [{"price_symbol": symbol, "price": price} for symbol, price in prices_by_symbol.items()]
+    )
     
+    PortfolioPosition.recompute_market_values(db, list(prices_by_symbol))
     db.commit()
-    return updated_count
+    return result.rowcount
+
+# Running quantities at or below this are a closed position (half the column's 8-decimal step)
+_CLOSED_QUANTITY = 0.5e-8
+
+def _symbol_positions(codes: np.ndarray, quantity: np.ndarray, unit_cost: np.ndarray,
+                      opening_quantity: np.ndarray, opening_cost_basis: np.ndarray) -> tuple:
+    """
+    Final quantity and cost basis per symbol code, applying the rows in order.
+    A row that leaves the running quantity at or below zero resets the cost basis.
+    """
+    total_quantity = opening_quantity.copy()
+    total_cost_basis = opening_cost_basis.copy()
+    for i in range(codes.size):
+        code = codes[i]
+        total_quantity[code] += quantity[i]
+        if total_quantity[code] > _CLOSED_QUANTITY:
+            total_cost_basis[code] += quantity[i] * unit_cost[i]
+        else:
+            total_cost_basis[code] = 0.0
+    return total_quantity, total_cost_basis
+
+if NUMBA_AVAILABLE:
+    _symbol_positions = njit(cache=True)(_symbol_positions)
+
+def _symbol_positions_np(codes: np.ndarray, quantity: np.ndarray, unit_cost: np.ndarray,
+                         opening_quantity: np.ndarray, opening_cost_basis: np.ndarray) -> tuple:
+    """_symbol_positions without numba: running quantities from one grouped cumsum,
+    cost basis summed with np.bincount over the rows after each symbol's last reset"""
+    n_symbols = opening_quantity.size
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    sorted_quantity = quantity[order]
+    cumulative = np.cumsum(sorted_quantity)
+    group_start = np.searchsorted(sorted_codes, np.arange(n_symbols))
+    before_group = cumulative[group_start] - sorted_quantity[group_start]
+    running = np.empty_like(cumulative)
+    running[order] = opening_quantity[sorted_codes] + cumulative - before_group[sorted_codes]
+
+    reset_rows = np.flatnonzero(running <= _CLOSED_QUANTITY)
+    last_reset = np.full(n_symbols, -1, dtype=np.intp)
+    np.maximum.at(last_reset, codes[reset_rows], reset_rows)
+    after_reset = np.arange(codes.size) > last_reset[codes]
+
+    total_quantity = opening_quantity + np.bincount(codes, weights=quantity, minlength=n_symbols)
+    total_cost_basis = np.bincount(
+        codes[after_reset], weights=(quantity * unit_cost)[after_reset], minlength=n_symbols
+    ) + np.where(last_reset < 0, opening_cost_basis, 0.0)
+    return total_quantity, total_cost_basis
+
+def aggregate_transactions_by_symbol(
+    transactions: List[Dict[str, Any]],
+    opening_positions: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Collapse transactions into one final position per symbol (in first-seen order).
+    
+    Starting from opening_positions ({symbol: (quantity, average_cost)}, empty by
+    default), the result has the same quantity and average cost as applying the rows
+    one by one with upsert_position_from_transaction: each buy adds to the cost basis,
+    and a row that takes the running quantity to zero or below resets the average cost
+    to 0. Symbols are encoded as integer codes; the fold runs as a JIT-compiled single
+    pass when numba is available, otherwise as grouped NumPy reductions.
+    """
+    if not transactions:
+        return []
+    
+    codes_by_symbol: Dict[str, int] = {}
+    count = len(transactions)
+    codes = np.fromiter(
+        (codes_by_symbol.setdefault(t['symbol'].upper(), len(codes_by_symbol)) for t in transactions),
+        dtype=np.intp, count=count
+    )
+    quantity = np.fromiter((t['quantity'] for t in transactions), dtype=np.float64, count=count)
+    unit_cost = np.fromiter((t.get('unit_cost', 0) for t in transactions), dtype=np.float64, count=count)
+    
+    opening_positions = opening_positions or {}
+    opening = [opening_positions.get(symbol, (0.0, 0.0)) for symbol in codes_by_symbol]
+    opening_quantity = np.array([float(q) for q, _ in opening], dtype=np.float64)
+    opening_cost_basis = opening_quantity * np.array([float(c) for _, c in opening], dtype=np.float64)
+    
+    fold = _symbol_positions if NUMBA_AVAILABLE else _symbol_positions_np
+    total_quantity, total_cost_basis = fold(codes, quantity, unit_cost, opening_quantity, opening_cost_basis)
+    # Round to the quantity column's scale so a fully closed symbol nets to exactly zero
+    total_quantity = total_quantity.round(8)
+    average_cost = np.divide(
+        total_cost_basis, total_quantity, out=np.zeros_like(total_cost_basis), where=total_quantity != 0
+    )
+    
+    return [
+        {"symbol": symbol, "quantity": net_quantity, "unit_cost": cost}
+        for symbol, net_quantity, cost in zip(codes_by_symbol, total_quantity.tolist(), average_cost.tolist())
+    ]
+
+def apply_transactions_to_portfolio(db: Session, user_id: str, transactions: List[Dict[str, Any]]) -> None:
+    """
+    Apply uploaded transactions to the user's active positions WITHOUT committing.
+    Positions are loaded in one query and written once per symbol; a new symbol that
+    nets to zero within the upload is not created.
+    """
+    symbols = {t['symbol'].upper() for t in transactions}
+    existing = {
+        position.symbol: position
+        for position in db.scalars(select(PortfolioPosition).where(
+            PortfolioPosition.user_id == user_id,
+            PortfolioPosition.is_active == True,
+            PortfolioPosition.symbol.in_(symbols)
+        ))
+    }
+    opening = {
+        symbol: (float(position.quantity), float(position.average_cost))
+        for symbol, position in existing.items()
+    }
+    
+    now = datetime.utcnow()
+    for final in aggregate_transactions_by_symbol(transactions, opening):
+        position = existing.get(final['symbol'])
+        if position is not None:
+            position.quantity = final['quantity']
+            position.average_cost = final['unit_cost']
+            position.updated_at = now
+        elif final['quantity'] != 0:
+            position_create_data = PositionCreate(
+                symbol=final['symbol'],
+                quantity=final['quantity'],
+                average_cost=final['unit_cost']
+            )
+            db.add(PortfolioPosition(
+                user_id=user_id,
+                symbol=position_create_data.symbol,
+                quantity=position_create_data.quantity,
+                average_cost=position_create_data.average_cost
+            ))
 
 def upsert_position_from_transaction(db: Session, user_id: str, transaction_data: Dict[str, Any]) -> PortfolioPosition:
     """
@@ -323,21 +547,22 @@ def upsert_position_from_transaction(db: Session, user_id: str, transaction_data
     The commit will be handled by the calling endpoint.
     """
     symbol = transaction_data['symbol'].upper()
-    new_quantity = Decimal(str(transaction_data['quantity']))
-    new_cost = Decimal(str(transaction_data.get('unit_cost', 0)))
+    # Weighted-average math in float; the Numeric columns convert on write
+    new_quantity = float(transaction_data['quantity'])
+    new_cost = float(transaction_data.get('unit_cost', 0))
 
     existing_position = get_position_by_symbol(db, symbol, user_id)
 
     if existing_position:
         # Update logic
-        old_quantity = existing_position.quantity
-        old_avg_cost = existing_position.average_cost
+        old_quantity = float(existing_position.quantity)
+        old_avg_cost = float(existing_position.average_cost)
         total_quantity = old_quantity + new_quantity
         
         if total_quantity > 0:
             new_average_cost = ((old_quantity * old_avg_cost) + (new_quantity * new_cost)) / total_quantity
         else:
-            new_average_cost = Decimal('0.0')
+            new_average_cost = 0.0
 
         existing_position.quantity = total_quantity
         existing_position.average_cost = new_average_cost
@@ -348,26 +573,42 @@ def upsert_position_from_transaction(db: Session, user_id: str, transaction_data
         # Create logic
         position_create_data = PositionCreate(
             symbol=symbol,
-            quantity=float(new_quantity),
-            average_cost=float(new_cost)
+            quantity=new_quantity,
+            average_cost=new_cost
         )
         # create_position also commits, so we'll replicate its logic without the commit
         db_position = PortfolioPosition(
             user_id=user_id,
             symbol=position_create_data.symbol,
-            quantity=Decimal(str(position_create_data.quantity)),
-            average_cost=Decimal(str(position_create_data.average_cost))
+            quantity=position_create_data.quantity,
+            average_cost=position_create_data.average_cost
         )
         db.add(db_position)
         # No db.commit() here
         return db_position
 
 def calculate_portfolio_summary(db: Session, user_id: str) -> PortfolioSummary:
-    """Calculate portfolio summary statistics"""
-    positions = get_user_portfolio(db, user_id)
-    position_responses = [convert_position_to_response(pos) for pos in positions]
+    """
+    Calculate portfolio summary statistics. Totals and allocations are aggregated
+    in SQL per (sector, asset class) group; only the top holdings are loaded as rows.
+    """
+    active = (PortfolioPosition.user_id == user_id, PortfolioPosition.is_active == True)
+    groups = db.execute(
+        select(
+            PortfolioPosition.sector,
+            PortfolioPosition.asset_class,
+            func.count().label("positions"),
+            func.sum(PortfolioPosition.market_value).label("market_value"),
+            func.sum(PortfolioPosition.average_cost * PortfolioPosition.quantity).label("cost_basis"),
+            # Allocations only count positions that have a (non-zero) market value
+            func.sum(case((PortfolioPosition.market_value != 0, 1), else_=0)).label("valued_positions"),
+        )
+        .where(*active)
+        .group_by(PortfolioPosition.sector, PortfolioPosition.asset_class)
+    ).all()
+    total_positions = sum(group.positions for group in groups)
     
-    if not positions:
+    if not total_positions:
         return PortfolioSummary(
             total_positions=0,
             total_market_value=0.0,
@@ -380,30 +621,36 @@ def calculate_portfolio_summary(db: Session, user_id: str) -> PortfolioSummary:
         )
     
     # Calculate totals
-    total_market_value = sum(float(pos.market_value or 0) for pos in positions)
-    total_cost_basis = sum(float(pos.average_cost * pos.quantity) for pos in positions)
+    total_market_value = sum(float(group.market_value or 0) for group in groups)
+    total_cost_basis = sum(float(group.cost_basis or 0) for group in groups)
     total_unrealized_gain_loss = total_market_value - total_cost_basis
     total_unrealized_gain_loss_percent = (
         (total_unrealized_gain_loss / total_cost_basis * 100) if total_cost_basis > 0 else 0
     )
     
-    # Top holdings (by market value)
-    top_holdings = sorted(
-        position_responses,
-        key=lambda x: x.market_value or 0,
-        reverse=True
-    )[:5]
+    # Top holdings (by market value; positions without one rank as zero)
+    top_holdings = [
+        convert_position_to_response(pos)
+        for pos in db.execute(
+            select(PortfolioPosition.__table__)
+            .where(*active)
+            .order_by(func.coalesce(PortfolioPosition.market_value, 0).desc())
+            .limit(5)
+        )
+    ]
     
     # Sector allocation
     sector_allocation = {}
     asset_class_allocation = {}
     
-    for pos in positions:
-        if pos.sector and pos.market_value:
-            sector_allocation[pos.sector] = sector_allocation.get(pos.sector, 0) + float(pos.market_value)
+    for group in groups:
+        if not group.valued_positions:
+            continue
+        if group.sector:
+            sector_allocation[group.sector] = sector_allocation.get(group.sector, 0) + float(group.market_value)
         
-        if pos.asset_class and pos.market_value:
-            asset_class_allocation[pos.asset_class] = asset_class_allocation.get(pos.asset_class, 0) + float(pos.market_value)
+        if group.asset_class:
+            asset_class_allocation[group.asset_class] = asset_class_allocation.get(group.asset_class, 0) + float(group.market_value)
     
     # Convert to percentages
     if total_market_value > 0:
@@ -411,7 +658,7 @@ def calculate_portfolio_summary(db: Session, user_id: str) -> PortfolioSummary:
         asset_class_allocation = {k: (v / total_market_value * 100) for k, v in asset_class_allocation.items()}
     
     return PortfolioSummary(
-        total_positions=len(positions),
+        total_positions=total_positions,
         total_market_value=total_market_value,
         total_cost_basis=total_cost_basis,
         total_unrealized_gain_loss=total_unrealized_gain_loss,
@@ -425,9 +672,13 @@ def calculate_portfolio_summary(db: Session, user_id: str) -> PortfolioSummary:
 # HELPER FUNCTIONS
 # ================================
 
-def convert_position_to_response(position: PortfolioPosition) -> PositionResponse:
-    """Convert SQLAlchemy Position to Pydantic PositionResponse"""
-    return PositionResponse(
+def convert_position_to_response(position: Union[PortfolioPosition, Row]) -> PositionResponse:
+    """
+    Convert SQLAlchemy Position (or a get_user_portfolio_rows row) to Pydantic PositionResponse.
+    Only used for database reads: the fields are already typed by the columns, so
+    validation is skipped (user input still goes through PositionCreate/PositionUpdate).
+    """
+    return PositionResponse.model_construct(
         id=position.id,
         user_id=position.user_id,
         symbol=position.symbol,
@@ -441,52 +692,57 @@ def convert_position_to_response(position: PortfolioPosition) -> PositionRespons
         sector=position.sector,
         asset_class=position.asset_class,
         exchange=position.exchange,
-        extra_data=json.loads(position.extra_data) if position.extra_data else {},
+        extra_data=_json_loads(position.extra_data) if position.extra_data else {},
         is_active=position.is_active,
         created_at=position.created_at,
         updated_at=position.updated_at,
         last_price_update=position.last_price_update
     )
 
+# Built once: serializes a whole list of responses to JSON in one pass
+_position_response_list = TypeAdapter(List[PositionResponse])
+
+def positions_to_json(positions: List[Union[PortfolioPosition, Row]]) -> bytes:
+    """Encode positions as a JSON array of PositionResponse objects"""
+    return _position_response_list.dump_json([convert_position_to_response(pos) for pos in positions])
+
 def get_portfolio_symbols(db: Session, user_id: str) -> List[str]:
-    """Get list of symbols in user's portfolio"""
-    positions = db.query(PortfolioPosition).filter(
-        PortfolioPosition.user_id == user_id,
-        PortfolioPosition.is_active == True
-    ).all()
-    
-    return [pos.symbol for pos in positions]
+    """Get list of symbols in user's portfolio (symbol column only, no entity loading)"""
+    return list(db.scalars(
+        select(PortfolioPosition.symbol).where(
+            PortfolioPosition.user_id == user_id,
+            PortfolioPosition.is_active == True
+        )
+    ))
 
 # ================================
 # LEGACY SUPPORT FUNCTIONS
 # ================================
 
-def save_user_portfolio(db: Session, user_id: str, portfolio_data: List[Dict]) -> List[PortfolioPosition]:
+# Built once: validating a whole list through one adapter avoids per-row model setup
+_position_create_list = TypeAdapter(List[PositionCreate])
+
+def save_user_portfolio(db: Session, user_id: str, portfolio_data: List[Union[Dict, PositionCreate]]) -> List[PortfolioPosition]:
     """
     Legacy function to save entire portfolio
     Maintains compatibility with existing code
+    Accepts raw dicts or already-validated PositionCreate models (passed through as-is)
     """
+    # Validate every row in one pass before touching existing positions
+    position_creates = _position_create_list.validate_python(portfolio_data)
+    
     # Clear existing positions (soft delete)
     existing_positions = get_user_portfolio(db, user_id)
     for pos in existing_positions:
         pos.is_active = False
     
-    # Create new positions
-    new_positions = []
-    for pos_data in portfolio_data:
-        position_create = PositionCreate(
-            symbol=pos_data['symbol'],
-            name=pos_data.get('name'),
-            quantity=pos_data['quantity'],
-            average_cost=pos_data['average_cost'],
-            sector=pos_data.get('sector'),
-            asset_class=pos_data.get('asset_class'),
-            exchange=pos_data.get('exchange'),
-            extra_data=pos_data.get('extra_data')
-        )
-        
-        new_position = create_position(db, position_create, user_id)
-        new_positions.append(new_position)
+    # Create new positions: ids drawn in one batch, one flush and commit for the whole set
+    new_positions = [
+        _build_position(position_create, user_id, position_id)
+        for position_create, position_id in zip(position_creates, new_position_ids(len(position_creates)))
+    ]
+    db.add_all(new_positions)
+    db.commit()
     
     return new_positions
 
@@ -5,7 +5,8 @@ SQLAlchemy models for database persistence + Pydantic models for API validation
 
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, Text
+from functools import lru_cache
+from sqlalchemy import Column, String, Boolean, DateTime, Text, or_, exists, select, update, bindparam
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.orm import Session, relationship
 from sqlalchemy.sql import func
@@ -194,15 +195,26 @@ class AuthError(BaseModel):
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
     """Get user by email from database"""
-    return db.query(User).filter(User.email == email.lower()).first()
+    return db.scalars(select(User).where(User.email == email.lower()).limit(1)).first()
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
     """Get user by username from database"""
-    return db.query(User).filter(User.username == username.lower()).first()
+    return db.scalars(select(User).where(User.username == username.lower()).limit(1)).first()
+
+def get_users_by_email_or_username(db: Session, email: Optional[str], username: Optional[str]) -> List[User]:
+    """Get users matching the email or the username in a single query"""
+    conditions = []
+    if email:
+        conditions.append(User.email == email.lower())
+    if username:
+        conditions.append(User.username == username.lower())
+    if not conditions:
+        return []
+    return list(db.scalars(select(User).where(or_(*conditions))))
 
 def get_user_by_id(db: Session, user_id: str) -> Optional[User]:
     """Get user by ID from database"""
-    return db.query(User).filter(User.id == user_id).first()
+    return db.scalars(select(User).where(User.id == user_id).limit(1)).first()
 
 def create_user_in_db(db: Session, user_data: UserCreate, hashed_password: str) -> User:
     """Create user in database"""
@@ -219,9 +231,10 @@ def create_user_in_db(db: Session, user_data: UserCreate, hashed_password: str)
     db.refresh(db_user)
     return db_user
 
-def update_user_in_db(db: Session, user_id: str, update_data: UserUpdate) -> Optional[User]:
-    """Update user in database"""
-    db_user = get_user_by_id(db, user_id)
+def update_user_in_db(db: Session, user_id: str, update_data: UserUpdate, db_user: Optional[User] = None) -> Optional[User]:
+    """Update user in database (pass an already-loaded db_user to skip the re-select)"""
+    if db_user is None:
+        db_user = get_user_by_id(db, user_id)
     if not db_user:
         return None
     
@@ -246,6 +259,32 @@ def update_user_login_time(db: Session, user_id: str) -> Optional[User]:
         db.refresh(db_user)
     return db_user
 
+def record_user_login(session_factory, user_id: str) -> None:
+    """Update last login time in a fresh session (runs as a background task after the response)"""
+    db = session_factory()
+    try:
+        update_user_login_time(db, user_id)
+    finally:
+        db.close()
+
+def record_user_logins(session_factory, logins: Dict[str, datetime]) -> None:
+    """Write a batch of {user_id: login time} in one executemany UPDATE and a single commit"""
+    if not logins:
+        return
+    # Core executemany keyed on id: a user deleted since logging in matches no
+    # row and is skipped instead of failing the whole batch
+    users = User.__table__.c
+    rows = [
+        {"login_user_id": user_id, "last_login": logged_in_at, "updated_at": logged_in_at}
+        for user_id, logged_in_at in logins.items()
+    ]
+    db = session_factory()
+    try:
+        db.execute(update(User.__table__).where(users.id == bindparam("login_user_id")), rows)
+        db.commit()
+    finally:
+        db.close()
+
 def delete_user_from_db(db: Session, user_id: str) -> bool:
     """Delete user from database"""
     db_user = get_user_by_id(db, user_id)
@@ -264,12 +303,11 @@ def get_user_count(db: Session) -> int:
     return db.query(User).count()
 
 def user_exists(db: Session, email: str, username: str = None) -> bool:
-    """Check if user exists by email or username"""
-    if get_user_by_email(db, email):
-        return True
-    if username and get_user_by_username(db, username):
-        return True
-    return False
+    """Check if user exists by email or username (single EXISTS query, no rows loaded)"""
+    condition = User.email == email.lower()
+    if username:
+        condition = or_(condition, User.username == username.lower())
+    return db.scalar(select(exists().where(condition)))
 
 def verify_user_password(db: Session, email: str, password: str, pwd_context) -> Optional[User]:
     """Verify user password and return user if valid"""
@@ -277,9 +315,14 @@ def verify_user_password(db: Session, email: str, password: str, pwd_context) ->
     if not user:
         return None
     
-    if not pwd_context.verify(password, user.hashed_password):
+    verified, new_hash = pwd_context.verify_and_update(password, user.hashed_password)
+    if not verified:
         return None
     
+    # Hash was created with an outdated cost; the caller's next commit persists the upgrade
+    if new_hash:
+        user.hashed_password = new_hash
+    
     return user
 
 # ================================
@@ -302,17 +345,43 @@ def validate_user_data(user_data: dict) -> dict:
     
     return user_data
 
+@lru_cache(maxsize=4096)
+def _build_user_response(
+    user_id: str,
+    email: str,
+    username: str,
+    full_name: Optional[str],
+    is_active: bool,
+    created_at: datetime,
+    updated_at: Optional[datetime],
+    last_login: Optional[datetime]
+) -> UserResponse:
+    """Build a UserResponse from hashable column values (memoized)"""
+    # Values come straight from the database, so validation is skipped
+    return UserResponse.model_construct(
+        id=user_id,
+        email=email,
+        username=username,
+        full_name=full_name,
+        is_active=is_active,
+        created_at=created_at,
+        updated_at=updated_at,
+        last_login=last_login
+    )
+
 def convert_user_to_response(user: User) -> UserResponse:
     """Convert SQLAlchemy User to Pydantic UserResponse"""
-    return UserResponse(
-        id=user.id,
-        email=user.email,
-        username=user.username,
-        full_name=user.full_name,
-        is_active=user.is_active,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        last_login=user.last_login
+    # Every response field is part of the key, so profile or login updates
+    # produce a new entry and stale ones age out of the LRU
+    return _build_user_response(
+        user.id,
+        user.email,
+        user.username,
+        user.full_name,
+        user.is_active,
+        user.created_at,
+        user.updated_at,
+        user.last_login
     )
 
 # ================================
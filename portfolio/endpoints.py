@@ -3,8 +3,8 @@ Portfolio management endpoints with database persistence
 Updated to use SQLAlchemy instead of in-memory storage
 """
 
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Dict, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 import logging
 from pydantic import BaseModel
@@ -14,17 +14,18 @@ from datetime import datetime
 from core.database import get_db
 from models.portfolio import (
     PortfolioPosition, PositionCreate, PositionUpdate, PositionResponse,
-    PortfolioSummary,
+    PortfolioSummary, SectorAllocationResponse, AssetClassAllocationResponse,
     PortfolioResponse as PortfolioResponseSchema,  # Aliased for clarity
-    get_user_portfolio, get_position_by_id, get_position_by_symbol,
+    get_user_portfolio, get_user_portfolio_rows, get_position_by_id, get_position_by_symbol,
     create_position, update_position, delete_position,
-    calculate_portfolio_summary, convert_position_to_response,
+    calculate_portfolio_summary, convert_position_to_response, positions_to_json,
     save_user_portfolio, create_sample_portfolio, get_portfolio_symbols,
     update_position_prices,
-    upsert_position_from_transaction
+    apply_transactions_to_portfolio
 )
 from models.user import User
 from auth.endpoints import get_current_active_user
+from utils.response_cache import ttl_json_cache
 
 
 # Configure logging
@@ -52,7 +53,7 @@ async def get_my_portfolio(
 ):
     """Get current user's complete portfolio"""
     try:
-        positions = get_user_portfolio(db, current_user.id)
+        positions = get_user_portfolio_rows(db, current_user.id)
         position_responses = [convert_position_to_response(pos) for pos in positions]
         summary = calculate_portfolio_summary(db, current_user.id)
         
@@ -84,8 +85,9 @@ async def get_portfolio_positions(
 ):
     """Get all positions in user's portfolio. Uses PositionResponse for single positions."""
     try:
-        positions = get_user_portfolio(db, current_user.id)
-        return [convert_position_to_response(pos) for pos in positions]
+        positions = get_user_portfolio_rows(db, current_user.id)
+        # Encoded here in one pass instead of FastAPI re-validating each response row
+        return Response(content=positions_to_json(positions), media_type="application/json")
     except Exception as e:
         logger.error(f"Error retrieving positions for user {current_user.id}: {e}")
         raise HTTPException(
@@ -217,9 +219,9 @@ async def upload_csv_portfolio(
     logger.info(f"Starting CSV upload for user {current_user.email} with {len(transactions)} transactions.")
 
     try:
-        # Process all transactions in the session
-        for tx in transactions:
-            upsert_position_from_transaction(db=db, user_id=current_user.id, transaction_data=tx.dict())
+        # Fold the transactions per symbol first, so each position is looked up and
+        # written once (and repeated new symbols do not create duplicate positions)
+        apply_transactions_to_portfolio(db, current_user.id, [tx.dict() for tx in transactions])
 
         # Commit the entire transaction at once
         db.commit()
@@ -247,7 +249,7 @@ async def upload_csv_portfolio(
 
 @router.post("/bulk-save", response_model=List[PositionResponse])
 async def save_portfolio_bulk(
-    portfolio_data: List[Dict[str, Any]],
+    portfolio_data: List[PositionCreate],
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -255,7 +257,7 @@ async def save_portfolio_bulk(
     try:
         positions = save_user_portfolio(db, current_user.id, portfolio_data)
         logger.info(f"Bulk saved portfolio for user {current_user.email}: {len(positions)} positions")
-        return [convert_position_to_response(pos) for pos in positions]
+        return Response(content=positions_to_json(positions), media_type="application/json")
     except Exception as e:
         logger.error(f"Error bulk saving portfolio for user {current_user.id}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save portfolio")
@@ -268,7 +270,8 @@ async def update_portfolio_prices(
 ):
     """Update current prices for portfolio positions"""
     try:
-        user_symbols = get_portfolio_symbols(db, current_user.id)
+        # Set membership keeps the filter O(1) per submitted symbol
+        user_symbols = set(get_portfolio_symbols(db, current_user.id))
         filtered_updates = {symbol: price for symbol, price in price_updates.items() if symbol.upper() in user_symbols}
         
         if not filtered_updates:
@@ -289,7 +292,7 @@ async def update_portfolio_prices(
 # PORTFOLIO ANALYSIS ENDPOINTS
 # ================================
 
-@router.get("/allocation/sector")
+@router.get("/allocation/sector", response_model=SectorAllocationResponse)
 async def get_sector_allocation(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -309,7 +312,7 @@ async def get_sector_allocation(
             detail="Failed to calculate sector allocation"
         )
 
-@router.get("/allocation/asset-class")
+@router.get("/allocation/asset-class", response_model=AssetClassAllocationResponse)
 async def get_asset_class_allocation(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -337,7 +340,7 @@ async def get_portfolio_performance(
     """Get portfolio performance metrics"""
     try:
         summary = calculate_portfolio_summary(db, current_user.id)
-        positions = get_user_portfolio(db, current_user.id)
+        positions = get_user_portfolio_rows(db, current_user.id)
         
         # Calculate additional performance metrics
         best_performer = None
@@ -416,8 +419,8 @@ async def debug_portfolio_info(
 ):
     """Debug endpoint for portfolio information"""
     try:
-        positions = get_user_portfolio(db, current_user.id)
-        symbols = get_portfolio_symbols(db, current_user.id)
+        positions = get_user_portfolio_rows(db, current_user.id)
+        symbols = [pos.symbol for pos in positions]
         
         return {
             "user_id": current_user.id,
@@ -454,7 +457,7 @@ async def get_portfolio_legacy(
 
 @router.post("/", response_model=List[PositionResponse])
 async def save_portfolio_legacy(
-    portfolio_data: List[Dict[str, Any]],
+    portfolio_data: List[PositionCreate],
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -466,6 +469,7 @@ async def save_portfolio_legacy(
 # ================================
 
 @router.get("/health")
+@ttl_json_cache(ttl_seconds=5)
 async def portfolio_health_check(db: Session = Depends(get_db)):
     """Health check for portfolio system"""
     try:
@@ -0,0 +1,242 @@
+"""
+Test script for analysis endpoints
+Verifies the analysis router is mounted and its numeric payloads and caching
+"""
+
+import base64
+
+import numpy as np
+
+from testing_helpers import in_memory_session_factory, router_client
+
+TEST_USER_ID = "analysis-test-user"
+TEST_USER_EMAIL = "analysis@example.com"
+
+def _analysis_client(SessionFactory=None):
+    """TestClient for the analysis router with authentication stubbed out"""
+    from analysis.endpoints import analysis_router
+    return router_client(analysis_router, TEST_USER_ID, TEST_USER_EMAIL, SessionFactory)
+
+def test_analysis_router_mounted():
+    """The main application serves the analysis routes"""
+
+    print("🧪 Testing Analysis Router...")
+    print("=" * 50)
+
+    from core.main import app
+
+    print("✅ Test 1: Analysis Routes Registered")
+    paths = app.openapi()["paths"]
+    assert "/api/v1/analysis/health" in paths
+    assert "/api/v1/analysis/risk/cvar" in paths
+    assert "/api/v1/analysis/portfolio/beta" in paths
+    print("   Analysis router mounted on the main app")
+
+def test_analysis_routes_respond():
+    """Every mounted analysis route answers a valid request with 200"""
+
+    print("🧪 Testing Analysis Route Status Codes...")
+    print("=" * 50)
+
+    import asyncio
+    import analysis.endpoints as analysis_endpoints
+    from models.portfolio import PortfolioPosition
+
+    SessionFactory = in_memory_session_factory(TEST_USER_ID, TEST_USER_EMAIL)
+    with SessionFactory() as db:
+        db.add(PortfolioPosition(
+            user_id=TEST_USER_ID, symbol="AAPL", quantity=10, average_cost=150,
+            current_price=170, market_value=1700
+        ))
+        db.commit()
+
+    async def fake_beta(portfolio_data, benchmark="SPY"):
+        await asyncio.sleep(0)
+        return {"success": True, "portfolio_beta": 1.1}
+
+    _, client = _analysis_client(SessionFactory)
+    analysis_endpoints._result_cache.clear()
+    original_beta = analysis_endpoints.calculate_portfolio_beta
+    analysis_endpoints.calculate_portfolio_beta = fake_beta
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0005, 0.01, 300).tolist()
+    prices = (100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))).tolist()
+    portfolio_data = [{"symbol": "AAPL", "total_cost_basis": 25000}]
+    try:
+        responses = {
+            "risk/cvar": client.post("/api/v1/analysis/risk/cvar", json=returns),
+            "risk/stress-test": client.post("/api/v1/analysis/risk/stress-test", json={"portfolio_data": portfolio_data}),
+            "fractal/hurst-exponent": client.post("/api/v1/analysis/fractal/hurst-exponent", json=prices),
+            "volatility/garch": client.post("/api/v1/analysis/volatility/garch", json=portfolio_data),
+            "regime/detect": client.post("/api/v1/analysis/regime/detect", json=returns),
+            "portfolio/multi-var": client.get("/api/v1/analysis/portfolio/multi-var"),
+            "portfolio/beta": client.get("/api/v1/analysis/portfolio/beta"),
+            "health": client.get("/api/v1/analysis/health"),
+        }
+        for route, response in responses.items():
+            print(f"✅ {route}")
+            assert response.status_code == 200, f"{route}: {response.status_code} {response.text}"
+
+        print("✅ portfolio/multi-var levels")
+        var_analysis = responses["portfolio/multi-var"].json()["var_analysis"]
+        assert var_analysis["success"] is True
+        assert client.get(
+            "/api/v1/analysis/portfolio/multi-var", params={"confidence_levels": "0.95,1.5"}
+        ).status_code == 400
+        print("   Out-of-range confidence level rejected with 400")
+    finally:
+        analysis_endpoints.calculate_portfolio_beta = original_beta
+        analysis_endpoints._result_cache.clear()
+
+def test_numeric_payload_forms():
+    """JSON, base64 and raw float64 bodies give the same cached CVaR result"""
+
+    print("🧪 Testing Numeric Payloads...")
+    print("=" * 50)
+
+    import analysis.endpoints as analysis_endpoints
+    _, client = _analysis_client()
+    analysis_endpoints._result_cache.clear()
+
+    returns = np.random.default_rng(7).normal(0.001, 0.02, 300)
+    raw = returns.astype("<f8").tobytes()
+
+    print("✅ Test 1: JSON Number Array")
+    json_response = client.post("/api/v1/analysis/risk/cvar", json=returns.tolist())
+    assert json_response.status_code == 200
+    assert json_response.json()["data_points"] == 300
+    print(f"   CVaR: {json_response.json()['cvar']:.4f}")
+
+    print("✅ Test 2: Base64 and Binary Bodies")
+    base64_response = client.post("/api/v1/analysis/risk/cvar", json=base64.b64encode(raw).decode("ascii"))
+    binary_response = client.post(
+        "/api/v1/analysis/risk/cvar", content=raw, headers={"Content-Type": "application/octet-stream"}
+    )
+    assert base64_response.json() == json_response.json()
+    assert binary_response.json() == json_response.json()
+    print("   All payload forms agree")
+
+    print("✅ Test 3: Identical Payloads Share One Cache Entry")
+    assert len([key for key in analysis_endpoints._result_cache if key.startswith("cvar:")]) == 1
+    print("   One cached CVaR body")
+
+    print("✅ Test 4: Malformed Payloads Rejected")
+    assert client.post("/api/v1/analysis/risk/cvar", json={"returns": [0.1]}).status_code == 422
+    assert client.post(
+        "/api/v1/analysis/risk/cvar", content=raw[:-1], headers={"Content-Type": "application/octet-stream"}
+    ).status_code == 400
+    print("   Non-array and truncated bodies rejected")
+
+def test_numeric_payload_openapi():
+    """Routes reading raw numeric bodies still document them in OpenAPI"""
+
+    print("🧪 Testing Numeric Payload Schema...")
+    print("=" * 50)
+
+    app, _ = _analysis_client()
+    paths = app.openapi()["paths"]
+
+    print("✅ Test 1: Request Body Declared")
+    for path in ("/api/v1/analysis/risk/cvar", "/api/v1/analysis/fractal/hurst-exponent", "/api/v1/analysis/regime/detect"):
+        request_body = paths[path]["post"]["requestBody"]
+        assert request_body["required"] is True
+        json_forms = request_body["content"]["application/json"]["schema"]["oneOf"]
+        assert {form["type"] for form in json_forms} == {"array", "string"}
+        assert request_body["content"]["application/octet-stream"]["schema"]["format"] == "binary"
+    print("   JSON array, base64 and binary forms documented")
+
+def test_garch_forecast_not_cached():
+    """GARCH forecasts draw random jitter, so they are recomputed every call"""
+
+    print("🧪 Testing GARCH Forecast Caching...")
+    print("=" * 50)
+
+    import analysis.endpoints as analysis_endpoints
+    _, client = _analysis_client()
+    analysis_endpoints._result_cache.clear()
+
+    print("✅ Test 1: Forecast Results Are Not Stored")
+    portfolio_data = [{"symbol": "AAPL", "total_cost_basis": 25000}]
+    for _ in range(2):
+        response = client.post("/api/v1/analysis/volatility/garch", json=portfolio_data)
+        assert response.status_code == 200
+        assert response.json()["success"] is True
+    assert not [key for key in analysis_endpoints._result_cache if key.startswith("garch:")]
+    print("   No cached GARCH bodies")
+
+def test_portfolio_beta_cache():
+    """Beta for the stored portfolio is computed once per holdings snapshot"""
+
+    print("🧪 Testing Portfolio Beta Cache...")
+    print("=" * 50)
+
+    import asyncio
+    import analysis.endpoints as analysis_endpoints
+    from models.portfolio import PortfolioPosition
+
+    SessionFactory = in_memory_session_factory(TEST_USER_ID, TEST_USER_EMAIL)
+    with SessionFactory() as db:
+        db.add(PortfolioPosition(
+            id="beta-position", user_id=TEST_USER_ID, symbol="AAPL",
+            quantity=10, average_cost=150, current_price=170, market_value=1700
+        ))
+        db.commit()
+
+    calls = []
+
+    async def fake_beta(portfolio_data, benchmark="SPY"):
+        calls.append([pos["symbol"] for pos in portfolio_data])
+        await asyncio.sleep(0)
+        return {"success": True, "portfolio_beta": 1.1 + len(calls) / 100}
+
+    _, client = _analysis_client(SessionFactory)
+    analysis_endpoints._result_cache.clear()
+    original_beta = analysis_endpoints.calculate_portfolio_beta
+    analysis_endpoints.calculate_portfolio_beta = fake_beta
+    try:
+        print("✅ Test 1: Stored Portfolio Is Loaded")
+        first = client.get("/api/v1/analysis/portfolio/beta")
+        assert first.status_code == 200, first.text
+        assert calls == [["AAPL"]]
+        print(f"   Beta computed for stored holdings: {first.json()['beta_analysis']['portfolio_beta']}")
+
+        print("✅ Test 2: Unchanged Holdings Hit the Cache")
+        second = client.get("/api/v1/analysis/portfolio/beta")
+        assert second.content == first.content
+        assert len(calls) == 1
+        print("   Second request answered from cache")
+
+        print("✅ Test 3: Changed Holdings Recompute")
+        with SessionFactory() as db:
+            db.get(PortfolioPosition, "beta-position").quantity = 20
+            db.commit()
+        third = client.get("/api/v1/analysis/portfolio/beta")
+        assert third.status_code == 200
+        assert len(calls) == 2
+        assert third.content != first.content
+        print("   New snapshot computed")
+
+        print("✅ Test 4: Stress Test and GARCH Use the Stored Portfolio")
+        assert client.post("/api/v1/analysis/risk/stress-test").status_code == 200
+        garch = client.post("/api/v1/analysis/volatility/garch")
+        assert garch.status_code == 200
+        assert garch.json()["forecast_data"]["success"] is True
+        print("   Stored positions loaded for both endpoints")
+    finally:
+        analysis_endpoints.calculate_portfolio_beta = original_beta
+        analysis_endpoints._result_cache.clear()
+
+if __name__ == "__main__":
+    """Run all analysis endpoint tests"""
+
+    print("🚀 Gertie.ai Analysis Endpoints Test Suite")
+    print("=" * 60)
+
+    test_analysis_router_mounted()
+    test_analysis_routes_respond()
+    test_numeric_payload_forms()
+    test_numeric_payload_openapi()
+    test_garch_forecast_not_cached()
+    test_portfolio_beta_cache()
+
+    print("=" * 60)
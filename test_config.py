@@ -69,10 +69,10 @@ def test_jwt_dependencies():
     print("=" * 50)
     
     try:
-        # Test python-jose
-        print("✅ Test 1: python-jose[cryptography]")
-        from jose import jwt, JWTError
-        print("   python-jose imported successfully")
+        # Test PyJWT
+        print("✅ Test 1: PyJWT")
+        import jwt
+        print("   PyJWT imported successfully")
         
         # Test passlib
         print("✅ Test 2: passlib[bcrypt]")
@@ -117,7 +117,7 @@ def test_jwt_dependencies():
         
     except ImportError as e:
         print(f"❌ Import Error: {e}")
-        print("   Run: pip install python-jose[cryptography] passlib[bcrypt] python-multipart")
+        print("   Run: pip install PyJWT passlib[bcrypt] python-multipart")
         return False
         
     except Exception as e:
@@ -0,0 +1,57 @@
+"""
+Test script for market data batching
+Verifies that batched price requests always release their callers
+"""
+
+import asyncio
+
+def test_price_request_during_inflight_flush():
+    """A price request made while a batch is downloading gets its own flush"""
+
+    print("🧪 Testing Price Request Batching...")
+    print("=" * 50)
+
+    import utils.market_data as market_data
+
+    downloads = []
+
+    async def fake_download(tickers):
+        downloads.append(list(tickers))
+        await asyncio.sleep(0.2)
+        return {ticker: 100.0 + len(ticker) for ticker in tickers}
+
+    async def scenario():
+        first = asyncio.ensure_future(market_data.get_current_prices(["AAPL"]))
+        # Wait until the first batch has been taken and its download started
+        while not downloads:
+            await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(market_data.get_current_prices(["MSFT"]))
+        return await asyncio.wait_for(asyncio.gather(first, second), timeout=2.0)
+
+    original_download = market_data._download_current_prices
+    market_data._download_current_prices = fake_download
+    try:
+        print("✅ Test 1: Request During In-Flight Download")
+        first_prices, second_prices = asyncio.run(scenario())
+    finally:
+        market_data._download_current_prices = original_download
+        market_data._price_batch_task = None
+        market_data._pending_price_requests.clear()
+
+    assert first_prices == {"AAPL": 104.0}
+    assert second_prices == {"MSFT": 104.0}
+    assert downloads == [["AAPL"], ["MSFT"]]
+    print(f"   Both callers released: {first_prices}, {second_prices}")
+
+    print("=" * 50)
+    print("🎉 All market data batching tests passed!")
+
+if __name__ == "__main__":
+    """Run all market data tests"""
+
+    print("🚀 Gertie.ai Market Data Test Suite")
+    print("=" * 60)
+
+    test_price_request_during_inflight_flush()
+
+    print("=" * 60)
@@ -0,0 +1,188 @@
+"""
+Test script for portfolio models and database operations
+Verifies CSV transaction aggregation, price updates and the portfolio summary
+"""
+
+from testing_helpers import in_memory_session_factory, router_client
+
+TEST_USER_ID = "portfolio-test-user"
+TEST_USER_EMAIL = "portfolio@example.com"
+
+def _portfolio_client(SessionFactory):
+    """TestClient for the portfolio router on the given sessions, authentication stubbed out"""
+    from portfolio.endpoints import router
+    _, client = router_client(router, TEST_USER_ID, TEST_USER_EMAIL, SessionFactory)
+    return client
+
+def _positions_by_symbol(SessionFactory):
+    """Active positions for the test user keyed by symbol"""
+    from models.portfolio import get_user_portfolio
+    with SessionFactory() as db:
+        return {position.symbol: position for position in get_user_portfolio(db, TEST_USER_ID)}
+
+def test_transaction_aggregation():
+    """Transactions collapse to one net quantity and weighted average cost per symbol"""
+
+    print("🧪 Testing Transaction Aggregation...")
+    print("=" * 50)
+
+    from models.portfolio import aggregate_transactions_by_symbol
+
+    print("✅ Test 1: Mixed-Case Symbols Merge in First-Seen Order")
+    aggregated = aggregate_transactions_by_symbol([
+        {"symbol": "aapl", "quantity": 10, "unit_cost": 120},
+        {"symbol": "MSFT", "quantity": 5, "unit_cost": 300},
+        {"symbol": "AAPL", "quantity": 20, "unit_cost": 150},
+    ])
+    assert [entry["symbol"] for entry in aggregated] == ["AAPL", "MSFT"]
+    assert aggregated[0]["quantity"] == 30
+    assert abs(aggregated[0]["unit_cost"] - 140) < 1e-9
+    print(f"   AAPL: {aggregated[0]['quantity']} @ {aggregated[0]['unit_cost']:.2f}")
+
+    print("✅ Test 2: Net-Zero Symbol")
+    aggregated = aggregate_transactions_by_symbol([
+        {"symbol": "XOM", "quantity": 0.1, "unit_cost": 90},
+        {"symbol": "XOM", "quantity": 0.2, "unit_cost": 95},
+        {"symbol": "xom", "quantity": -0.3, "unit_cost": 100},
+    ])
+    assert aggregated == [{"symbol": "XOM", "quantity": 0.0, "unit_cost": 0.0}]
+    print("   Fully closed symbol nets to exactly zero")
+
+    print("✅ Test 3: Opening Position Closed Mid-Upload")
+    aggregated = aggregate_transactions_by_symbol([
+        {"symbol": "AAPL", "quantity": -10, "unit_cost": 120},
+        {"symbol": "AAPL", "quantity": 5, "unit_cost": 130},
+    ], {"AAPL": (10, 100)})
+    assert aggregated == [{"symbol": "AAPL", "quantity": 5.0, "unit_cost": 130.0}]
+    print("   Average cost resets when the running quantity reaches zero")
+
+    print("✅ Test 4: Empty Upload")
+    assert aggregate_transactions_by_symbol([]) == []
+    print("   No transactions, no symbols")
+
+def test_csv_upload_positions():
+    """CSV uploads write one position per symbol with the sequential weighted average"""
+
+    print("🧪 Testing CSV Upload...")
+    print("=" * 50)
+
+    from models.portfolio import PortfolioPosition
+
+    SessionFactory = in_memory_session_factory(TEST_USER_ID, TEST_USER_EMAIL)
+    with SessionFactory() as db:
+        db.add(PortfolioPosition(user_id=TEST_USER_ID, symbol="AAPL", quantity=10, average_cost=100))
+        db.commit()
+    client = _portfolio_client(SessionFactory)
+
+    print("✅ Test 1: Duplicates Against an Existing Position")
+    response = client.post("/api/v1/portfolios/upload-csv", json=[
+        {"symbol": "aapl", "quantity": 10, "unit_cost": 120},
+        {"symbol": "NVDA", "quantity": 4, "unit_cost": 400},
+        {"symbol": "AAPL", "quantity": 20, "unit_cost": 150},
+        {"symbol": "nvda", "quantity": 4, "unit_cost": 500},
+    ])
+    assert response.status_code == 200, response.text
+    positions = _positions_by_symbol(SessionFactory)
+    assert sorted(positions) == ["AAPL", "NVDA"]
+    # Same as applying the rows one by one: 10 @ 100, +10 @ 120, +20 @ 150
+    assert float(positions["AAPL"].quantity) == 40
+    assert float(positions["AAPL"].average_cost) == 130
+    assert float(positions["NVDA"].quantity) == 8
+    assert float(positions["NVDA"].average_cost) == 450
+    print(f"   AAPL: {float(positions['AAPL'].quantity)} @ {float(positions['AAPL'].average_cost)}")
+
+    print("✅ Test 2: Net-Zero Symbols")
+    response = client.post("/api/v1/portfolios/upload-csv", json=[
+        {"symbol": "TSLA", "quantity": 5, "unit_cost": 200},
+        {"symbol": "tsla", "quantity": -5, "unit_cost": 210},
+        {"symbol": "AAPL", "quantity": 2, "unit_cost": 160},
+        {"symbol": "AAPL", "quantity": -2, "unit_cost": 165},
+    ])
+    assert response.status_code == 200, response.text
+    positions = _positions_by_symbol(SessionFactory)
+    assert "TSLA" not in positions
+    # Row by row: 40 @ 130, +2 @ 160, -2 @ 165
+    assert float(positions["AAPL"].quantity) == 40
+    assert float(positions["AAPL"].average_cost) == 129.75
+    print("   Closed new symbol skipped, existing position follows the row-by-row cost")
+
+    print("✅ Test 3: Position Closed Partway Through the Upload")
+    with SessionFactory() as db:
+        db.add(PortfolioPosition(user_id=TEST_USER_ID, symbol="MSFT", quantity=10, average_cost=100))
+        db.commit()
+    response = client.post("/api/v1/portfolios/upload-csv", json=[
+        {"symbol": "MSFT", "quantity": -10, "unit_cost": 120},
+        {"symbol": "MSFT", "quantity": 5, "unit_cost": 130},
+    ])
+    assert response.status_code == 200, response.text
+    positions = _positions_by_symbol(SessionFactory)
+    assert float(positions["MSFT"].quantity) == 5
+    assert float(positions["MSFT"].average_cost) == 130
+    print("   Cost basis restarts once the running quantity reaches zero")
+
+def test_price_update_market_values():
+    """Price updates derive market value and gain/loss for every matching position"""
+
+    print("🧪 Testing Price Updates...")
+    print("=" * 50)
+
+    from models.portfolio import PortfolioPosition, update_position_prices, calculate_portfolio_summary
+
+    SessionFactory = in_memory_session_factory(TEST_USER_ID, TEST_USER_EMAIL)
+    with SessionFactory() as db:
+        db.add_all([
+            PortfolioPosition(user_id=TEST_USER_ID, symbol="AAPL", quantity=10, average_cost=100,
+                              sector="Technology", asset_class="Equity"),
+            PortfolioPosition(user_id=TEST_USER_ID, symbol="MSFT", quantity=5, average_cost=300,
+                              sector="Technology", asset_class="Equity"),
+            PortfolioPosition(user_id=TEST_USER_ID, symbol="XOM", quantity=20, average_cost=50,
+                              sector="Energy", asset_class="Equity"),
+            PortfolioPosition(user_id=TEST_USER_ID, symbol="GLD", quantity=2, average_cost=180,
+                              sector="Commodities", asset_class="Commodity"),
+        ])
+        db.commit()
+
+        print("✅ Test 1: Prices Written by Symbol")
+        updated = update_position_prices(db, {"aapl": 110, "MSFT": 270, "XOM": 55, "UNKNOWN": 1})
+        assert updated == 3
+        print(f"   {updated} positions priced")
+
+    print("✅ Test 2: Derived Market Values")
+    positions = _positions_by_symbol(SessionFactory)
+    assert float(positions["AAPL"].market_value) == 1100
+    assert float(positions["AAPL"].unrealized_gain_loss) == 100
+    assert float(positions["AAPL"].unrealized_gain_loss_percent) == 10
+    assert float(positions["MSFT"].market_value) == 1350
+    assert float(positions["MSFT"].unrealized_gain_loss) == -150
+    assert float(positions["MSFT"].unrealized_gain_loss_percent) == -10
+    assert float(positions["XOM"].market_value) == 1100
+    assert positions["XOM"].last_price_update is not None
+    assert positions["GLD"].current_price is None and positions["GLD"].market_value is None
+    print("   Market value, gain/loss and percent match quantity x price")
+
+    print("✅ Test 3: Portfolio Summary")
+    with SessionFactory() as db:
+        summary = calculate_portfolio_summary(db, TEST_USER_ID)
+    assert summary.total_positions == 4
+    assert abs(summary.total_market_value - 3550) < 0.01
+    assert abs(summary.total_cost_basis - 3860) < 0.01
+    assert abs(summary.total_unrealized_gain_loss - (3550 - 3860)) < 0.01
+    assert [holding.symbol for holding in summary.top_holdings][:1] == ["MSFT"]
+    assert summary.top_holdings[-1].symbol == "GLD"
+    # Unpriced positions count toward totals but not allocations
+    assert set(summary.sector_allocation) == {"Technology", "Energy"}
+    assert abs(summary.sector_allocation["Technology"] - 2450 / 3550 * 100) < 1e-6
+    assert summary.asset_class_allocation == {"Equity": 100.0}
+    print(f"   Market value {summary.total_market_value:.2f}, cost basis {summary.total_cost_basis:.2f}")
+
+if __name__ == "__main__":
+    """Run all portfolio model tests"""
+
+    print("🚀 Gertie.ai Portfolio Models Test Suite")
+    print("=" * 60)
+
+    test_transaction_aggregation()
+    test_csv_upload_positions()
+    test_price_update_market_values()
+
+    print("=" * 60)
@@ -196,7 +196,39 @@ def test_jwt_tokens():
         assert debug_info["token_valid"] == True
         assert "payload" in debug_info
         print(f"   Token debug info: valid={debug_info['token_valid']}")
-        
+
+        # Test tampered signature is rejected
+        print("✅ Test 9: Tampered Token Rejection")
+        header, payload_segment, signature = access_token.split(".")
+        forged_signature = ("A" if signature[0] != "A" else "B") + signature[1:]
+        assert verify_token(f"{header}.{payload_segment}.{forged_signature}") is None
+        assert verify_token(f"{header}.{payload_segment}") is None
+        print(f"   Tampered token rejected")
+
+        # Test a token issued in the future is rejected, matching PyJWT
+        print("✅ Test 10: Future Issued-At Rejection")
+        import jwt
+        from config import settings
+        from auth.endpoints import verify_token as verify_access_token
+        future_token = jwt.encode(
+            {**user_data, "exp": int(time.time()) + 3600, "iat": int(time.time()) + 1000},
+            settings.SECRET_KEY,
+            algorithm=settings.ALGORITHM
+        )
+        assert verify_token(future_token) is None
+        try:
+            jwt.decode(future_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            assert False, "PyJWT should reject a future iat"
+        except jwt.ImmatureSignatureError:
+            pass
+        print(f"   Future iat rejected by both verification paths")
+
+        # Test the endpoint dependency accepts access tokens only
+        print("✅ Test 11: Endpoint Token Verification")
+        assert verify_access_token(access_token).email == "test@example.com"
+        assert verify_access_token(create_refresh_token(user_data)) is None
+        print(f"   Access token accepted, refresh token rejected")
+
         print("=" * 50)
         print("🎉 All JWT token tests passed!")
         return True
@@ -216,7 +248,8 @@ def test_security_features():
     try:
         from auth.security import (
             generate_reset_token, verify_reset_token,
-            hash_sensitive_data, verify_sensitive_data
+            hash_sensitive_data, verify_sensitive_data,
+            constant_time_compare
         )
         
         # Test password reset tokens
@@ -239,6 +272,12 @@ def test_security_features():
         assert verify_sensitive_data("wrong-key", hashed_data) == False
         print(f"   Sensitive data hashed and verified")
         
+        # Test constant-time comparison
+        print("✅ Test 3: Constant-Time Comparison")
+        assert constant_time_compare(reset_token, reset_token) == True
+        assert constant_time_compare(reset_token, reset_token[:-1]) == False
+        print(f"   Token comparison verified")
+        
         print("=" * 50)
         print("🎉 All security feature tests passed!")
         return True
@@ -219,6 +219,27 @@ def test_user_database_operations():
         traceback.print_exc()
         return False
 
+def test_record_user_logins_skips_missing_users():
+    """A batch containing a deleted user still records everyone else's login"""
+
+    print("\n🧪 Testing Batched Login Recording...")
+    print("=" * 50)
+
+    from datetime import datetime
+    from models.user import User, record_user_logins
+    from testing_helpers import in_memory_session_factory
+
+    SessionFactory = in_memory_session_factory("login-test-user", "login@example.com")
+    logged_in_at = datetime(2024, 1, 2, 3, 4, 5)
+
+    print("✅ Test 1: Missing User in the Batch")
+    record_user_logins(SessionFactory, {"login-test-user": logged_in_at, "ghost-user": logged_in_at})
+    with SessionFactory() as db:
+        user = db.get(User, "login-test-user")
+        assert user.last_login.replace(tzinfo=None) == logged_in_at
+        assert db.get(User, "ghost-user") is None
+    print("   Existing user updated, missing user skipped")
+
 if __name__ == "__main__":
     """Run all user model tests"""
     
@@ -228,6 +249,7 @@ if __name__ == "__main__":
     # Run tests
     models_ok = test_user_models()
     db_ok = test_user_database_operations()
+    test_record_user_logins_skips_missing_users()
     
     print("\n" + "=" * 60)
     if models_ok and db_ok:
@@ -0,0 +1,49 @@
+"""
+Shared helpers for the endpoint and model test scripts
+In-memory database sessions and router test clients with authentication stubbed out
+"""
+
+from types import SimpleNamespace
+from typing import Optional
+
+def in_memory_session_factory(user_id: Optional[str] = None, email: str = "test@example.com"):
+    """Session factory bound to a fresh in-memory SQLite database with all tables,
+    seeded with a user when user_id is given"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from core.database import Base
+    from models.user import User
+    from models.portfolio import PortfolioPosition
+
+    # Importing the models registers their tables on Base
+    assert PortfolioPosition.__tablename__ in Base.metadata.tables
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionFactory = sessionmaker(bind=engine, autoflush=False)
+    if user_id is not None:
+        with SessionFactory() as db:
+            db.add(User(id=user_id, email=email, username=user_id, hashed_password="x"))
+            db.commit()
+    return SessionFactory
+
+def router_client(router, user_id: str, email: str = "test@example.com", SessionFactory=None):
+    """FastAPI app and TestClient for one router, authenticated as a stub user
+    and, when SessionFactory is given, reading the database through it"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from auth.endpoints import get_current_active_user
+    from core.database import get_db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_active_user] = lambda: SimpleNamespace(
+        id=user_id, email=email, is_active=True
+    )
+    if SessionFactory is not None:
+        def override_get_db():
+            with SessionFactory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+    return app, TestClient(app)
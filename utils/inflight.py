@@ -0,0 +1,24 @@
+"""
+Shared in-flight task registry
+Concurrent callers asking for the same key await one task instead of repeating the work
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+async def join_inflight(
+    tasks: Dict[Hashable, asyncio.Future], key: Hashable, factory: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Await the task registered under key, starting it from factory() if none is
+    running on this event loop. The entry is removed when the task finishes.
+    """
+    loop = asyncio.get_running_loop()
+    pending = tasks.get(key)
+    if pending is None or pending.get_loop() is not loop:
+        pending = loop.create_task(factory())
+        tasks[key] = pending
+        pending.add_done_callback(lambda task: tasks.pop(key, None) if tasks.get(key) is task else None)
+    # Shield so one cancelled caller does not abort the task the others are waiting on
+    return await asyncio.shield(pending)
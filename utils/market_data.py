@@ -1,43 +1,97 @@
 import yfinance as yf
 import pandas as pd
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import logging
+
+from utils.inflight import join_inflight
+
+logger = logging.getLogger(__name__)
 
 # Cache remains the same
 _cache: Dict[str, pd.DataFrame] = {}
 _cache_expiry: Dict[str, datetime] = {}
 CACHE_DURATION_MINUTES = 60
 
+# A stalled Yahoo request is abandoned after this long so every waiter sharing
+# the fetch is released instead of hanging on the slowest download
+DOWNLOAD_TIMEOUT_SECONDS = 15.0
+
+# Downloads in progress, so concurrent requests for the same key share one fetch
+_inflight: Dict[str, asyncio.Future] = {}
+
 async def get_historical_data(tickers: List[str], period: str = "1y") -> Optional[pd.DataFrame]:
     cache_key = f"{','.join(sorted(tickers))}_{period}"
     if cache_key in _cache and datetime.now() < _cache_expiry[cache_key]:
-        print(f"CACHE HIT: Returning cached data for {tickers}")
+        logger.debug("Cache hit: returning cached data for %s", tickers)
         return _cache[cache_key]
 
-    print(f"API CALL (async): Fetching historical data for {tickers}")
+    return await join_inflight(_inflight, cache_key, lambda: _fetch_historical_data(tickers, period, cache_key))
+
+async def _fetch_historical_data(tickers: List[str], period: str, cache_key: str) -> Optional[pd.DataFrame]:
+    logger.info("Fetching historical data for %s", tickers)
     try:
-        loop = asyncio.get_event_loop()
-        data = await loop.run_in_executor(
-            None, 
-            lambda: yf.download(tickers, period=period, progress=False)
+        loop = asyncio.get_running_loop()
+        data = await asyncio.wait_for(
+            loop.run_in_executor(None, lambda: yf.download(tickers, period=period, progress=False)),
+            DOWNLOAD_TIMEOUT_SECONDS
         )
         if data.empty: return None
         _cache[cache_key] = data
         _cache_expiry[cache_key] = datetime.now() + timedelta(minutes=CACHE_DURATION_MINUTES)
         return data
+    except asyncio.TimeoutError:
+        logger.error("Timed out fetching historical data for %s after %ss", tickers, DOWNLOAD_TIMEOUT_SECONDS)
+        return None
     except Exception as e:
-        print(f"🔥 ERROR fetching historical data for {tickers}: {e}")
+        logger.error("Error fetching historical data for %s: %s", tickers, e)
         return None
 
+# Price requests arriving within this window are merged into one download
+PRICE_BATCH_WINDOW_SECONDS = 0.02
+_pending_price_requests: List[Tuple[List[str], asyncio.Future]] = []
+_price_batch_task: Optional[asyncio.Task] = None
+
 async def get_current_prices(tickers: List[str]) -> Dict[str, float]:
-    print(f"API CALL (async): Fetching current prices for {tickers}")
+    global _price_batch_task
+    loop = asyncio.get_running_loop()
+    result = loop.create_future()
+    _pending_price_requests.append((tickers, result))
+    if _price_batch_task is None or _price_batch_task.done() or _price_batch_task.get_loop() is not loop:
+        _price_batch_task = loop.create_task(_flush_price_batch())
+    return await result
+
+async def _flush_price_batch() -> None:
+    """Download the union of all pending tickers once and hand each caller its subset"""
+    global _price_batch_task
+    await asyncio.sleep(PRICE_BATCH_WINDOW_SECONDS)
+    batch = _pending_price_requests[:]
+    _pending_price_requests.clear()
+    # Requests arriving during the download start their own batch instead of
+    # queueing behind a flush that has already taken its batch
+    if _price_batch_task is asyncio.current_task():
+        _price_batch_task = None
+
+    all_tickers = sorted({ticker for tickers, _ in batch for ticker in tickers})
+    prices: Dict[str, float] = {}
+    try:
+        if all_tickers:
+            prices = await _download_current_prices(all_tickers)
+    finally:
+        # Always release the waiters, even if the batch task is cancelled
+        for tickers, result in batch:
+            if not result.done():
+                result.set_result({ticker: prices[ticker] for ticker in tickers if ticker in prices})
+
+async def _download_current_prices(tickers: List[str]) -> Dict[str, float]:
+    logger.info("Fetching current prices for %s", tickers)
     prices = {}
     try:
-        loop = asyncio.get_event_loop()
-        data = await loop.run_in_executor(
-            None,
-            lambda: yf.download(tickers, period="2d", progress=False)
+        loop = asyncio.get_running_loop()
+        data = await asyncio.wait_for(
+            loop.run_in_executor(None, lambda: yf.download(tickers, period="2d", progress=False)),
+            DOWNLOAD_TIMEOUT_SECONDS
         )
         if data.empty: return {}
         for ticker in tickers:
@@ -49,6 +103,9 @@ async def get_current_prices(tickers: List[str]) -> Dict[str, float]:
             except (KeyError, IndexError):
                 continue
         return prices
+    except asyncio.TimeoutError:
+        logger.error("Timed out fetching current prices for %s after %ss", tickers, DOWNLOAD_TIMEOUT_SECONDS)
+        return {}
     except Exception as e:
-        print(f"🔥 ERROR fetching current prices for {tickers}: {e}")
+        logger.error("Error fetching current prices for %s: %s", tickers, e)
         return {}
\ No newline at end of file
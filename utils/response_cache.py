@@ -0,0 +1,76 @@
+"""
+Short-lived response cache for idempotent GET endpoints
+Stores the encoded JSON body so repeated polling skips both the handler and serialization
+"""
+
+import functools
+import json
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def encode_json(content: Any) -> bytes:
+    """Serialize an endpoint result to JSON bytes (orjson handles NumPy scalars natively)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+
+
+def ttl_get(cache: Dict[Hashable, Tuple[float, Any]], key: Hashable, now: float) -> Optional[Any]:
+    """Return the value stored under key in a {key: (deadline, value)} store, or None once expired"""
+    cached = cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    return None
+
+
+def ttl_put(
+    cache: Dict[Hashable, Tuple[float, Any]], key: Hashable, value: Any,
+    deadline: float, now: float, maxsize: int,
+) -> None:
+    """Store value until deadline, evicting expired (then oldest) entries when the store is full"""
+    if len(cache) >= maxsize:
+        for stale_key in [k for k, (d, _) in cache.items() if d <= now]:
+            del cache[stale_key]
+        if len(cache) >= maxsize:
+            # Still full: drop the oldest entry (dicts keep insertion order)
+            del cache[next(iter(cache))]
+    cache[key] = (deadline, value)
+
+
+_KEY_TYPES = (str, int, float, bool, type(None))
+
+
+def ttl_json_cache(ttl_seconds: float = 5.0, maxsize: int = 1024):
+    """
+    Cache an async endpoint's JSON response for ttl_seconds, keyed on its
+    scalar path/query parameters (injected dependencies such as DB sessions are
+    ignored). Only use on endpoints whose result does not depend on the caller.
+    """
+    def decorator(func: Callable):
+        cache: Dict[Tuple, Tuple[float, bytes]] = {}
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = tuple(sorted((name, value) for name, value in kwargs.items() if isinstance(value, _KEY_TYPES)))
+            now = time.monotonic()
+            cached = ttl_get(cache, key, now)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+
+            body = encode_json(await func(*args, **kwargs))
+            ttl_put(cache, key, body, now + ttl_seconds, now, maxsize)
+            return Response(content=body, media_type="application/json")
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,18 @@
+"""
+Shared timestamp helpers for response payloads
+"""
+
+import time
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _iso_timestamp_for_second(second: int) -> str:
+    """ISO timestamp formatted once per wall-clock second"""
+    return datetime.fromtimestamp(second).isoformat()
+
+
+def iso_timestamp() -> str:
+    """Current local time as an ISO string, at one-second resolution"""
+    return _iso_timestamp_for_second(int(time.time()))